@@ -0,0 +1,68 @@
+# Wheel spin animation as data, shared by the server GUI and the console.
+#
+# Copy this file next to code.py on the console Pico. It must stay
+# CircuitPython compatible: no typing, dataclasses or functools.
+#
+# A spin is a timeline of (led, on, t) keyframes: LED number 1-10, whether
+# it turns on or off, and seconds from the start of the animation. The GUI
+# plays it with Tk after() and the console plays it on its GPIO pins, so
+# both show the same animation with the same timing. Nothing in it is
+# random: the server rolls whether a spin fakes a stop and sends it in the
+# light_wheel message, so both sides build identical timelines from it.
+
+LEDS = 10
+# Order the light runs round the wheel
+ORDER = tuple(range(1, LEDS + 1))
+
+# Seconds each LED stays lit on the first lap, multiplied by SLOWDOWN per lap
+START_DELAY = 0.02
+SLOWDOWN = 2.2
+LAPS = 2
+# The light lingers on the LED before the target on a fake stop
+FAKE_PAUSE = 0.3
+# Between the two spins of a double choice
+GAP = 0.3
+# Chance the server gives a spin a fake stop
+FAKE_CHANCE = 0.25
+
+
+def spin(target, skip=None, fake=False, t=0.0):
+    """Keyframes for one spin starting at time `t` that stops on LED
+    `target` and leaves it lit. LED `skip` is passed over. Returns
+    (frames, time the target lights)."""
+    order = [led for led in ORDER if led != skip]
+    if target not in order:
+        raise ValueError("No LED " + str(target) + " to stop on")
+    before = order[order.index(target) - 1]
+    frames = []
+    delay = START_DELAY
+    for lap in range(LAPS):
+        last = lap == LAPS - 1
+        for led in order:
+            frames.append((led, True, t))
+            if last and led == target:
+                return frames, t
+            t += delay
+            frames.append((led, False, t))
+            if last and fake and led == before:
+                frames.append((led, True, t))
+                t += FAKE_PAUSE
+                frames.append((led, False, t))
+        delay *= SLOWDOWN
+    return frames, t
+
+
+def timeline(choice, fake=False):
+    """Keyframes for a light_wheel choice: one LED number, or two for the
+    guessers, where the second spin skips the first LED, which stays lit.
+    With `fake` the first spin fakes a stop."""
+    if isinstance(choice, (list, tuple)):
+        first, t = spin(choice[0], fake=fake)
+        second, t = spin(choice[1], skip=choice[0], t=t + GAP)
+        return first + second
+    frames, t = spin(choice, fake=fake)
+    return frames
+
+
+def duration(frames):
+    return frames[-1][2] if frames else 0.0
@@ -0,0 +1,195 @@
+import json
+import struct
+
+# Wire codec shared by the server, the remotes and the console.
+#
+# Copy this file next to code.py on each Pico. It must stay CircuitPython
+# compatible: no typing, dataclasses or functools.
+#
+# Two codecs exist. JSON is human readable and is what every device speaks
+# by default. BINARY packs each message into a fixed struct layout:
+#
+#   type (u8) | client id (u8) | fields for that type
+#
+# A client picks its codec in the "connect" message. JSON payloads always
+# start with "{" while binary type codes are below 0x20, so decode() can
+# tell them apart without knowing who sent the message.
+
+JSON = "json"
+BINARY = "binary"
+
+# Topics live under game/<table>/... so several tables can share a broker.
+# A table of None is the original single-table layout, game/...
+ROOT = "game"
+# Second-level names a table can't use since the single-table layout owns them
+CHANNELS = ("presence", "server", "client", "broadcast", "roles", "health",
+            "wheel", "picker", "guesser", "better", "console")
+
+TYPES = {
+    "connect": 1,
+    "disconnect": 2,
+    "ping": 3,
+    "pick": 4,
+    "guess": 5,
+    "bet": 6,
+    "role": 7,
+    "health": 8,
+    "light_wheel": 9,
+    "start": 10,
+    "win": 11,
+    "off": 12,
+    "clients": 13,
+    "rules": 14,
+}
+NAMES = dict((code, name) for name, code in TYPES.items())
+
+CODECS = (JSON, BINARY)
+
+# struct format strings. CircuitPython's struct has pack and unpack_from
+# but no Struct class, and raises ValueError where CPython raises struct.error
+_HEADER = "<BB"
+_U8 = "<B"
+_U16 = "<H"
+_I16 = "<h"
+_INDEXED = "<BH"
+_ROLE = "<BB"
+# max_health, bet_window, bet_bonus, penalty_cutoff, input_max, flags
+_RULES = "<HBBHHB"
+_RULE_FIELDS = ("max_health", "bet_window", "bet_bonus", "penalty_cutoff", "input_max")
+_STRUCT_ERROR = getattr(struct, "error", ValueError)
+
+# light_wheel count byte meaning "the console finished the animation"
+_WHEEL_DONE = 0xFF
+# Optional light_wheel flags byte after the ids
+_WHEEL_FAKE = 1
+
+
+def topic(table, *parts):
+    """MQTT topic for `parts` on a table, e.g. topic("3", "client", 7)."""
+    head = [ROOT] if table is None else [ROOT, str(table)]
+    return "/".join(head + [str(part) for part in parts])
+
+
+def encode_json(msg_type, client_id=None, data=None, **extra):
+    payload = {"type": msg_type}
+    if client_id is not None:
+        payload["id"] = client_id
+    if data is not None:
+        payload["data"] = data
+    payload.update(extra)
+    return json.dumps(payload)
+
+
+def encode_binary(msg_type, client_id=0, data=None, index=None, health=None, codec=None, fake=None):
+    """Pack a message into its binary layout. Raises ValueError if it has none."""
+    code = TYPES.get(msg_type)
+    if code is None:
+        raise ValueError("No binary layout for " + str(msg_type))
+    head = struct.pack(_HEADER, code, client_id or 0)
+
+    if msg_type in ("pick",):
+        return head + struct.pack(_U16, int(data))
+    if msg_type in ("guess", "bet"):
+        return head + struct.pack(_INDEXED, int(index or 0), int(data))
+    if msg_type == "health":
+        return head + struct.pack(_I16, int(health if health is not None else data))
+    if msg_type == "role":
+        role = str(data)
+        if "+" in role:
+            role, designation = role.split("+")
+        else:
+            designation = 0
+        return head + struct.pack(_ROLE, int(role), int(designation))
+    if msg_type in ("light_wheel", "clients"):
+        if data == "done":
+            return head + struct.pack(_U8, _WHEEL_DONE)
+        if data is None or data == "off":
+            ids = ()
+        elif isinstance(data, (list, tuple)):
+            ids = data
+        else:
+            ids = (int(data),)
+        body = head + struct.pack(_U8, len(ids)) + bytes(ids)
+        if fake is not None and ids:
+            body += struct.pack(_U8, _WHEEL_FAKE if fake else 0)
+        return body
+    if msg_type == "connect":
+        return head + struct.pack(_U8, 1 if codec == BINARY else 0)
+    if msg_type == "ping" and data is not None:
+        # Server probe stamp, echoed back so it can time the round trip
+        return head + struct.pack(_U16, int(data) & 0xFFFF)
+    if msg_type == "rules":
+        values = [int(data[field]) for field in _RULE_FIELDS]
+        values.append(1 if data.get("binary_display") else 0)
+        return head + struct.pack(_RULES, *values)
+    # ping, disconnect, start, win, off carry no fields
+    return head
+
+
+def encode(encoding, msg_type, client_id=0, data=None, **extra):
+    """Encode with the given codec (JSON or BINARY)."""
+    if encoding == BINARY:
+        return encode_binary(msg_type, client_id, data, **extra)
+    return encode_json(msg_type, client_id, data, **extra)
+
+
+def decode_binary(raw):
+    code, client_id = struct.unpack_from(_HEADER, raw, 0)
+    msg_type = NAMES.get(code)
+    if msg_type is None:
+        raise ValueError("Unknown message type " + str(code))
+    payload = {"type": msg_type, "id": client_id}
+
+    if msg_type == "pick":
+        payload["data"] = struct.unpack_from(_U16, raw, 2)[0]
+    elif msg_type in ("guess", "bet"):
+        index, value = struct.unpack_from(_INDEXED, raw, 2)
+        payload["index"] = index
+        payload["data"] = value
+    elif msg_type == "health":
+        payload["health"] = struct.unpack_from(_I16, raw, 2)[0]
+    elif msg_type == "role":
+        role, designation = struct.unpack_from(_ROLE, raw, 2)
+        payload["data"] = str(role) + "+" + str(designation) if designation else str(role)
+    elif msg_type in ("light_wheel", "clients"):
+        count = raw[2]
+        if count == _WHEEL_DONE:
+            payload["data"] = "done"
+        elif count == 0:
+            payload["data"] = "off" if msg_type == "light_wheel" else []
+        elif count == 1 and msg_type == "light_wheel":
+            payload["data"] = raw[3]
+        else:
+            payload["data"] = list(raw[3:3 + count])
+        if msg_type == "light_wheel" and 0 < count < _WHEEL_DONE and len(raw) > 3 + count:
+            payload["fake"] = bool(raw[3 + count] & _WHEEL_FAKE)
+    elif msg_type == "connect":
+        payload["codec"] = BINARY if len(raw) > 2 and raw[2] else JSON
+    elif msg_type == "ping" and len(raw) > 3:
+        payload["data"] = struct.unpack_from(_U16, raw, 2)[0]
+    elif msg_type == "rules":
+        values = struct.unpack_from(_RULES, raw, 2)
+        rules = dict(zip(_RULE_FIELDS, values))
+        rules["binary_display"] = bool(values[-1] & 1)
+        payload["data"] = rules
+    return payload
+
+
+def decode(raw):
+    """Decode a JSON or binary payload into a message dict.
+
+    Raises ValueError for anything that is neither.
+    """
+    if isinstance(raw, str):
+        raw = raw.encode()
+    if not raw:
+        raise ValueError("Empty payload")
+    if raw[0] == 0x7B:  # "{"
+        payload = json.loads(raw.decode())
+        if not isinstance(payload, dict):
+            raise ValueError("JSON payload is not an object")
+        return payload
+    try:
+        return decode_binary(raw)
+    except (IndexError, ValueError, _STRUCT_ERROR) as e:
+        raise ValueError("Truncated binary payload: " + str(e))
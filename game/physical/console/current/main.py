@@ -1,5 +1,4 @@
 import asyncio
-import random
 import time
 import array
 import math
@@ -14,8 +13,20 @@ import rotaryio
 import pwmio
 import adafruit_displayio_sh1106
 import displayio
-import json 
 import adafruit_minimqtt.adafruit_minimqtt as MQTT
+import wheel
+import wire
+
+# Binary codec on the wire; set to wire.JSON to read traffic while debugging
+CODEC = wire.BINARY
+
+# Table this console runs when the server hosts several; None for the
+# single-table game/... topics
+TABLE = None
+
+# Presence is tracked through a retained status plus a last-will, so pings
+# are only a slow liveness hint. 0 disables them.
+PING_INTERVAL = 60
 
 
 class Display:
@@ -109,6 +120,11 @@ class MQTTGameClient:
         self.password = "password123"
 
         self.last_ping = time.monotonic()
+        # Pings never change, encode once
+        self.ping_payload = wire.encode(CODEC, "ping", self.client_id)
+        self.presence_topic = wire.topic(TABLE, "presence", self.client_id)
+        self.online_payload = wire.encode(CODEC, "connect", self.client_id, codec=CODEC)
+        self.offline_payload = wire.encode(CODEC, "disconnect", self.client_id)
         
         self.connect()
         
@@ -139,11 +155,14 @@ class MQTTGameClient:
                     socket_pool=pool,
                     socket_timeout=0.5,    # Socket timeout shortest
                     keep_alive=15,         # Keep alive longest
+                    use_binary_mode=True,  # Payloads may be binary, don't decode to str
                 )
 
                 self.mqtt_client.on_connect = self.on_connect
                 self.mqtt_client.on_disconnect = self.on_disconnect
                 self.mqtt_client.on_message = self.on_message
+                # The broker publishes this retained "offline" status if we vanish
+                self.mqtt_client.will_set(self.presence_topic, self.offline_payload, qos=1, retain=True)
 
                 self.mqtt_client.connect()
                 print("Connected to MQTT broker")
@@ -152,13 +171,10 @@ class MQTTGameClient:
                 print(f"Connection failed: {e}")
 
     async def ping_loop(self):
-        while True:
+        while PING_INTERVAL:
             if self.connected:
-                self.publish("game/server", json.dumps({
-                    "type": "ping",
-                    "id": self.client_id
-                }))
-            await asyncio.sleep(5)  # Ping every 5 seconds
+                self.publish(wire.topic(TABLE, "server"), self.ping_payload)
+            await asyncio.sleep(PING_INTERVAL)
 
     def on_connect(self, client, userdata, flags, rc):
         print(f"Connected with result code {rc}")
@@ -166,14 +182,14 @@ class MQTTGameClient:
             self.connected = True
             # Subscribe to topics
             topics = [
-                f"game/client/{self.client_id}",
-                "game/broadcast"
+                wire.topic(TABLE, "client", self.client_id),
+                wire.topic(TABLE, "broadcast")
             ]
             for topic in topics:
                 client.subscribe(topic)
 
-            connect_payload = {"type": "connect", "id": self.client_id}
-            self.publish("game/server", json.dumps(connect_payload))
+            # Retained "online" status; it also picks the codec the server replies with
+            self.publish(self.presence_topic, self.online_payload, retain=True)
 
     def on_disconnect(self, client, userdata, rc):
         print(f"Disconnected with result code {rc}")
@@ -182,12 +198,12 @@ class MQTTGameClient:
         # Try to reconnect
         self.connect()
             
-    def publish(self, topic, message):
+    def publish(self, topic, message, retain=False):
         if not self.connected:
             self.connect()
         try:
             print(f"Publishing to {topic}: {message}")
-            self.mqtt_client.publish(topic, message, qos=1)
+            self.mqtt_client.publish(topic, message, retain=retain, qos=1)
             return True
         except Exception as e:
             print(f"Publish failed: {e}")
@@ -244,49 +260,17 @@ class Console:
 
         asyncio.run(self.startup())
 
-    def light_wheel(self, choice=None, double_choice=False):
-        def spin_to_choice(target, initial_speed=0.02, skip_light=None):
-            speed = initial_speed
-            spins = 2  # Fixed number for consistent timing
-            do_fake = random.random() < 0.25 and not skip_light  # Only fake on first spin
-            
-            for spin in range(spins):
-                for light_id, light in self.lights.items():
-                    if light_id == skip_light:
-                        continue
-                        
-                    light.value = True
-                    time.sleep(speed)
-                    light.value = False
-                    
-                    if spin == spins - 1 and light_id == target - 1 and do_fake:
-                        light.value = True
-                        time.sleep(0.3)  # Brief fake pause
-                        light.value = False
-                        continue
-                        
-                    if spin == spins - 1 and light_id == target:
-                        light.value = True
-                        return
-                        
-                speed *= 2.2  # Faster exponential slowdown
-
+    def light_wheel(self, choice, fake=False):
+        # Same keyframes the server GUI plays; sleeping to absolute times
+        # keeps the total duration exact however long each pin write takes
+        frames = wheel.timeline(choice, fake)
         self.turn_off_all_lights()
-        if not choice:
-            raise ValueError("No choice provided")
-
-        if double_choice:
-            if not isinstance(choice, list) or len(choice) != 2:
-                raise ValueError("Choice must be a list of two values")
-                
-            # First spin leaving light on
-            spin_to_choice(choice[0], initial_speed=0.02)
-            time.sleep(0.3)  # Quick pause between spins
-            
-            # Second spin skipping lit light
-            spin_to_choice(choice[1], initial_speed=0.02, skip_light=choice[0])
-        else:
-            spin_to_choice(choice, initial_speed=0.02)
+        start = time.monotonic()
+        for led, on, t in frames:
+            delay = start + t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.lights[led].value = on
 
     async def startup(self):
         """Handle startup sequence"""
@@ -309,8 +293,8 @@ class Console:
 
     def _on_mqtt_message(self, topic, message):
         try:
-            # Parse incoming JSON
-            payload = json.loads(message)
+            # JSON or binary, whichever the server sent
+            payload = wire.decode(message)
             # Pass payload to our game logic
             self.process_server_data(payload)
         except Exception as e:
@@ -344,7 +328,7 @@ class Console:
             if self.start.value:
                 self.turn_off_all_lights()
                 self.started = True
-                self.client.publish("game/console", json.dumps({"type": "start"}))
+                self.client.publish(wire.topic(TABLE, "console"), wire.encode(CODEC, "start", 0))
 
             await asyncio.sleep(0.1)
             
@@ -354,6 +338,9 @@ class Console:
 
         if msg_type == "clients":
             try:
+                if isinstance(data, list):
+                    self.clients = data
+                    return
                 # Clean up dict_keys format and extract numbers
                 cleaned = data.replace('dict_keys(', '').replace(')', '').replace('[', '').replace(']', '')
                 client_list = cleaned.replace(' ', '').split(',')
@@ -362,12 +349,14 @@ class Console:
                 print(f"Error parsing clients: {e}")
                 self.clients = []
         elif msg_type == "light_wheel":
-            if "off" in data:
+            if data == "off":
                 self.turn_off_all_lights()
             else:
-                self.light_wheel(int(data)) if not isinstance(data, list) else self.light_wheel(data, double_choice=True)
-            self.client.publish("game/wheel/response", 
-                json.dumps({"type": "light_wheel", "data": "done"}))
+                self.light_wheel(data if isinstance(data, list) else int(data), payload.get("fake", False))
+            self.client.publish(wire.topic(TABLE, "wheel", "response"), wire.encode(CODEC, "light_wheel", 0, "done"))
+        elif msg_type == "ping":
+            # Echo the server's probe so it can time the round trip
+            self.client.publish(wire.topic(TABLE, "server"), wire.encode(CODEC, "ping", 0, data))
         elif msg_type == "display":
             pass
         elif msg_type == "win":
@@ -10,14 +10,26 @@ import rotaryio
 import pwmio
 import supervisor
 import adafruit_minimqtt.adafruit_minimqtt as MQTT
-import json
 from adafruit_debouncer import Debouncer
 from enum import Enum
+import wire
 
 ID = 1
 
+# Table this remote plays at when the server hosts several; None for the
+# single-table game/... topics
+TABLE = None
+
 DEBUG = False
 
+# Binary codec on the wire, JSON while debugging so traffic stays readable
+CODEC = wire.JSON if DEBUG else wire.BINARY
+
+# Presence is tracked through a retained status plus a last-will, so pings
+# are only a slow liveness hint. 0 disables them.
+PING_INTERVAL = 60
+
+# Rule defaults until the server sends its rule set at connect
 LIMITED = True
 
 class MQTTGameClient:
@@ -35,17 +47,19 @@ class MQTTGameClient:
         self.leds["led1"].value = True  # MQTT status
 
         self.last_ping = time.monotonic()
+        # Pings never change, encode once
+        self.ping_payload = wire.encode(CODEC, "ping", self.client_id)
+        self.presence_topic = wire.topic(TABLE, "presence", self.client_id)
+        self.online_payload = wire.encode(CODEC, "connect", self.client_id, codec=CODEC)
+        self.offline_payload = wire.encode(CODEC, "disconnect", self.client_id)
         
         asyncio.run(self.connect())
 
     async def ping_loop(self):
-        while True:
+        while PING_INTERVAL:
             if self.connected:
-                self.publish("game/server", json.dumps({
-                    "type": "ping",
-                    "id": self.client_id
-                }))
-            await asyncio.sleep(5)  # Ping every 5 seconds
+                self.publish(wire.topic(TABLE, "server"), self.ping_payload)
+            await asyncio.sleep(PING_INTERVAL)
         
     async def connect(self):
         while not self.connected:
@@ -70,11 +84,14 @@ class MQTTGameClient:
                     socket_pool=pool,
                     socket_timeout=0.5,    # Socket timeout shortest
                     keep_alive=10,         # Keep alive longest
+                    use_binary_mode=True,  # Payloads may be binary, don't decode to str
                 )
 
                 self.mqtt_client.on_connect = self.on_connect
                 self.mqtt_client.on_disconnect = self.on_disconnect
                 self.mqtt_client.on_message = self.on_message
+                # The broker publishes this retained "offline" status if we vanish
+                self.mqtt_client.will_set(self.presence_topic, self.offline_payload, qos=1, retain=True)
 
                 self.mqtt_client.connect()
                 return
@@ -89,26 +106,23 @@ class MQTTGameClient:
             self.leds["led1"].value = False
             # Subscribe to topics
             topics = [
-                f"game/client/{self.client_id}",
-                "game/broadcast",
-                "game/roles/#",
-                "game/health",
+                wire.topic(TABLE, "client", self.client_id),
+                wire.topic(TABLE, "broadcast"),
+                wire.topic(TABLE, "roles", "#"),
+                wire.topic(TABLE, "health"),
             ]
             for topic in topics:
                 client.subscribe(topic)
 
-            connect_payload = {"type": "connect", "id": self.client_id}
-            self.publish("game/server", json.dumps(connect_payload))
+            # Retained "online" status; it also picks the codec the server replies with
+            self.publish(self.presence_topic, self.online_payload, retain=True)
 
     def on_disconnect(self, client, userdata, rc):
         self.connected = False
         self.leds["led1"].value = True
         # Send disconnect message before fully disconnecting
         try:
-            self.publish("game/server", json.dumps({
-                "type": "disconnect",
-                "id": self.client_id
-            }))
+            self.publish(self.presence_topic, self.offline_payload, retain=True)
         except:
             pass  # Ignore errors when trying to send disconnect
             
@@ -116,7 +130,7 @@ class MQTTGameClient:
         if not self.connected:
             self.connect()
         try:
-            self.mqtt_client.publish(topic, message, retain=False, qos=1)
+            self.mqtt_client.publish(topic, message, retain=retain, qos=1)
             return True
         except Exception as e:
             if DEBUG: print(f"Publish failed: {e}")
@@ -324,7 +338,11 @@ class Controller:
         self.display_flash = False
         self.display_health = True
         self.role = PlayerState.DEFAULT
-        self.health = 100 if not LIMITED else 15
+        # Rule values until the server sends its "rules" message
+        self.max_health = 100 if not LIMITED else 15
+        self.input_max = 100 if not LIMITED else 15
+        self.binary_display = LIMITED
+        self.health = self.max_health
         self.start = False
         self.role_number = None
         self.guess_ready = False
@@ -344,8 +362,8 @@ class Controller:
 
     def _on_mqtt_message(self, topic, message):
         try:
-            # Parse incoming JSON
-            payload = json.loads(message)
+            # JSON or binary, whichever the server sent
+            payload = wire.decode(message)
             # Pass payload to our game logic
             self.process_server_data(payload)
         except Exception as e:
@@ -391,23 +409,12 @@ class Controller:
         }
 
         self.ROLE_PUBLISHERS = {
-            PlayerState.PICKER: lambda self: self.client.publish("game/picker/response", json.dumps({
-                "type": "pick",
-                "data": self.encoder0_counter,
-                "id": ID
-            })),
-            PlayerState.GUESSER: lambda self: self.client.publish("game/guesser/response", json.dumps({
-                "type": "guess",
-                "data": self.encoder0_counter,
-                "id": ID,
-                "index": self.role_number
-            })),
-            PlayerState.BETTER: lambda self: self.client.publish("game/better/response", json.dumps({
-                "type": "bet",
-                "data": self.encoder0_counter,
-                "id": ID,
-                "index": self.role_number
-            })),
+            PlayerState.PICKER: lambda self: self.client.publish(wire.topic(TABLE, "picker", "response"), wire.encode(
+                CODEC, "pick", ID, self.encoder0_counter)),
+            PlayerState.GUESSER: lambda self: self.client.publish(wire.topic(TABLE, "guesser", "response"), wire.encode(
+                CODEC, "guess", ID, self.encoder0_counter, index=int(self.role_number))),
+            PlayerState.BETTER: lambda self: self.client.publish(wire.topic(TABLE, "better", "response"), wire.encode(
+                CODEC, "bet", ID, self.encoder0_counter, index=int(self.role_number))),
         }
 
     async def flash_display(self):
@@ -437,7 +444,7 @@ class Controller:
                 
                 # Update display based on state
                 if self.display_health:
-                    if LIMITED:
+                    if self.binary_display:
                         self._display_binary(self.health)
                     else:
                         self.display.display_number(self.health)
@@ -487,17 +494,41 @@ class Controller:
         data = payload.get('data')
 
         handlers = {
-        "start": self.handle_start,
-        "role": self.handle_role,
-        "health": self.handle_health,
+        "start": self._handle_start,
+        "role": self._handle_role,
+        "health": self._handle_health,
+        "rules": self._handle_rules,
+        "ping": self._handle_ping,
         }
 
+        # Health arrives in its own field, everything else in data
+        if msg_type == "health":
+            data = payload.get('health', data)
+
         handler = handlers.get(msg_type)
         if handler:
             handler(data)
         elif msg_type in self.keywords:
             self.keywords[msg_type]()
 
+    def _handle_ping(self, stamp):
+        # Echo the server's probe so it can time the round trip
+        self.client.publish(wire.topic(TABLE, "server"), wire.encode(CODEC, "ping", ID, stamp))
+
+    def _handle_start(self, data):
+        self.start = True
+
+    def _handle_rules(self, rules):
+        if not isinstance(rules, dict):
+            return
+        # Only start from full health if the game hasn't changed it yet
+        fresh = self.health == self.max_health
+        self.max_health = int(rules.get("max_health", self.max_health))
+        self.input_max = int(rules.get("input_max", self.input_max))
+        self.binary_display = bool(rules.get("binary_display", self.binary_display))
+        if fresh:
+            self.health = self.max_health
+
     def _handle_health(self, health_data):
         if health_data is None:
             return
@@ -572,7 +603,7 @@ class Controller:
         encoder_position = self.encoder0.position
         delta = encoder_position - self.encoder0_counter
         if delta != 0:
-            self.encoder0_counter = max(0, min(self.encoder0_counter + delta, 15 if LIMITED else 100))
+            self.encoder0_counter = max(0, min(self.encoder0_counter + delta, self.input_max))
             self.encoder0.position = self.encoder0_counter
             if not self.display_health:
                 self.display.display_number(self.encoder0_counter)
@@ -0,0 +1,398 @@
+import asyncio
+import struct
+import threading
+import time
+
+from metrics import REGISTRY
+
+# Minimal in-process MQTT 3.1.1 broker.
+#
+# Covers what the game needs: QoS 0/1 (QoS 2 publishes from clients are
+# accepted and delivered at QoS 1), retained messages, +/# wildcard
+# subscriptions, keepalive and last-will. Sessions are always clean.
+
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+PUBREC = 5
+PUBREL = 6
+PUBCOMP = 7
+SUBSCRIBE = 8
+SUBACK = 9
+UNSUBSCRIBE = 10
+UNSUBACK = 11
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+CONNACK_ACCEPTED = 0
+CONNACK_BAD_PROTOCOL = 1
+CONNACK_BAD_CLIENT_ID = 2
+
+# Seconds between event loop lag samples (how late a timer callback runs)
+LAG_INTERVAL = 0.5
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def topic_matches(topic_filter, topic):
+    """Return True if `topic` matches the MQTT subscription `topic_filter`."""
+    # Wildcards never match topics starting with '$' at the first level
+    if topic.startswith("$") and topic_filter[:1] in ("+", "#"):
+        return False
+    f_parts = topic_filter.split("/")
+    t_parts = topic.split("/")
+    for i, part in enumerate(f_parts):
+        if part == "#":
+            return True
+        if i >= len(t_parts):
+            return False
+        if part != "+" and part != t_parts[i]:
+            return False
+    return len(f_parts) == len(t_parts)
+
+
+def valid_filter(topic_filter):
+    if not topic_filter:
+        return False
+    parts = topic_filter.split("/")
+    for i, part in enumerate(parts):
+        if "#" in part and (part != "#" or i != len(parts) - 1):
+            return False
+        if "+" in part and part != "+":
+            return False
+    return True
+
+
+def _encode_length(length):
+    out = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length:
+            byte |= 0x80
+        out.append(byte)
+        if not length:
+            return bytes(out)
+
+
+def _encode_str(value):
+    if isinstance(value, str):
+        value = value.encode()
+    return struct.pack("!H", len(value)) + value
+
+
+def _packet(packet_type, flags, body=b""):
+    return bytes([(packet_type << 4) | flags]) + _encode_length(len(body)) + body
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def u8(self):
+        if self.pos + 1 > len(self.data):
+            raise ProtocolError("Truncated packet")
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def u16(self):
+        if self.pos + 2 > len(self.data):
+            raise ProtocolError("Truncated packet")
+        value = struct.unpack_from("!H", self.data, self.pos)[0]
+        self.pos += 2
+        return value
+
+    def raw(self):
+        length = self.u16()
+        if self.pos + length > len(self.data):
+            raise ProtocolError("Truncated packet")
+        value = bytes(self.data[self.pos:self.pos + length])
+        self.pos += length
+        return value
+
+    def string(self):
+        try:
+            return self.raw().decode()
+        except UnicodeDecodeError:
+            raise ProtocolError("Invalid UTF-8 string")
+
+    def rest(self):
+        value = bytes(self.data[self.pos:])
+        self.pos = len(self.data)
+        return value
+
+    def remaining(self):
+        return len(self.data) - self.pos
+
+
+class _Session:
+    def __init__(self, broker, reader, writer):
+        self.broker = broker
+        self.reader = reader
+        self.writer = writer
+        self.client_id = None
+        self.keepalive = 0
+        self.will = None
+        self.subscriptions = {}
+        self.next_packet_id = 1
+        self.pending_qos2 = set()
+        self.closed = False
+
+    def packet_id(self):
+        pid = self.next_packet_id
+        self.next_packet_id = pid % 65535 + 1
+        return pid
+
+    def send(self, data):
+        if self.closed:
+            return
+        try:
+            self.writer.write(data)
+        except (ConnectionError, RuntimeError):
+            self.closed = True
+
+    def deliver(self, topic, payload, qos, retain=False):
+        flags = (qos << 1) | (1 if retain else 0)
+        body = _encode_str(topic)
+        if qos:
+            body += struct.pack("!H", self.packet_id())
+        self.send(_packet(PUBLISH, flags, body + payload))
+
+    def close(self):
+        self.closed = True
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+
+class Broker:
+    def __init__(self, host="0.0.0.0", port=1883, metrics=REGISTRY):
+        self.host = host
+        self.port = port
+        self.sessions = {}
+        self.retained = {}
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.error = None
+        self.loop_lag = metrics.histogram("broker.loop_lag")
+
+    # Lifecycle
+
+    def start(self, timeout=5):
+        """Start the broker on a background thread and block until it is listening."""
+        self.thread = threading.Thread(target=self._run, name="mqtt-broker", daemon=True)
+        self.thread.start()
+        if not self.ready.wait(timeout):
+            raise TimeoutError("MQTT broker did not become ready")
+        if self.error:
+            raise self.error
+        print(f"Embedded MQTT broker listening on {self.host}:{self.port}")
+
+    def stop(self):
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread:
+            self.thread.join(timeout=2)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.serve())
+        except Exception as e:
+            self.error = e
+            self.ready.set()
+            return
+        self.ready.set()
+        self.loop.call_later(LAG_INTERVAL, self._watch_lag, time.monotonic() + LAG_INTERVAL)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.server.close()
+            for session in list(self.sessions.values()):
+                session.will = None
+                session.close()
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.close()
+
+    def _watch_lag(self, due):
+        now = time.monotonic()
+        self.loop_lag.observe(max(0.0, now - due))
+        self.loop.call_later(LAG_INTERVAL, self._watch_lag, now + LAG_INTERVAL)
+
+    async def serve(self):
+        """Bind the listening socket. Can also be awaited from an existing loop."""
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        if self.port == 0:
+            self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    # Connection handling
+
+    async def _read_packet(self, reader, timeout):
+        header = await asyncio.wait_for(reader.readexactly(1), timeout)
+        length = 0
+        multiplier = 1
+        for _ in range(4):
+            byte = (await reader.readexactly(1))[0]
+            length += (byte & 0x7F) * multiplier
+            if not byte & 0x80:
+                break
+            multiplier *= 128
+        else:
+            raise ProtocolError("Malformed remaining length")
+        body = await reader.readexactly(length) if length else b""
+        return header[0] >> 4, header[0] & 0x0F, body
+
+    async def _handle_client(self, reader, writer):
+        session = _Session(self, reader, writer)
+        clean_exit = False
+        try:
+            packet_type, flags, body = await self._read_packet(reader, 10)
+            if packet_type != CONNECT or not self._handle_connect(session, body):
+                return
+            # Spec: drop the client after 1.5x keepalive without any packet
+            timeout = session.keepalive * 1.5 if session.keepalive else None
+            while not session.closed:
+                packet_type, flags, body = await self._read_packet(reader, timeout)
+                if packet_type == DISCONNECT:
+                    clean_exit = True
+                    break
+                self._handle_packet(session, packet_type, flags, body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, asyncio.CancelledError,
+                ConnectionError, ProtocolError):
+            pass
+        finally:
+            self._drop(session, publish_will=not clean_exit)
+
+    def _handle_connect(self, session, body):
+        r = _Reader(body)
+        protocol = r.string()
+        level = r.u8()
+        if protocol not in ("MQTT", "MQIsdp") or level not in (3, 4):
+            session.send(_packet(CONNACK, 0, bytes([0, CONNACK_BAD_PROTOCOL])))
+            return False
+        flags = r.u8()
+        session.keepalive = r.u16()
+        client_id = r.string()
+        if not client_id:
+            if not flags & 0x02:
+                session.send(_packet(CONNACK, 0, bytes([0, CONNACK_BAD_CLIENT_ID])))
+                return False
+            client_id = f"auto-{id(session):x}"
+        if flags & 0x04:
+            will_topic = r.string()
+            will_payload = r.raw()
+            session.will = (will_topic, will_payload, (flags >> 3) & 0x03, bool(flags & 0x20))
+        # Username/password are accepted and ignored (allow_anonymous)
+
+        existing = self.sessions.get(client_id)
+        if existing is not None:
+            # Session takeover: the old connection is dropped without its will
+            existing.will = None
+            existing.close()
+        session.client_id = client_id
+        self.sessions[client_id] = session
+        session.send(_packet(CONNACK, 0, bytes([0, CONNACK_ACCEPTED])))
+        return True
+
+    def _handle_packet(self, session, packet_type, flags, body):
+        r = _Reader(body)
+        if packet_type == PUBLISH:
+            qos = (flags >> 1) & 0x03
+            retain = bool(flags & 0x01)
+            topic = r.string()
+            if "+" in topic or "#" in topic:
+                raise ProtocolError("Wildcards are not allowed in PUBLISH topics")
+            pid = r.u16() if qos else None
+            payload = r.rest()
+            if qos == 1:
+                session.send(_packet(PUBACK, 0, struct.pack("!H", pid)))
+            elif qos == 2:
+                session.send(_packet(PUBREC, 0, struct.pack("!H", pid)))
+                if pid in session.pending_qos2:
+                    return  # Duplicate of an unreleased message
+                session.pending_qos2.add(pid)
+            self.publish(topic, payload, qos, retain)
+        elif packet_type == PUBREL:
+            pid = r.u16()
+            session.pending_qos2.discard(pid)
+            session.send(_packet(PUBCOMP, 0, struct.pack("!H", pid)))
+        elif packet_type in (PUBACK, PUBREC, PUBCOMP):
+            # Outbound deliveries are fire-and-forget at most QoS 1
+            if packet_type == PUBREC:
+                session.send(_packet(PUBREL, 0x02, body[:2]))
+        elif packet_type == SUBSCRIBE:
+            pid = r.u16()
+            granted = []
+            new_filters = []
+            while r.remaining():
+                topic_filter = r.string()
+                qos = r.u8() & 0x03
+                if not valid_filter(topic_filter):
+                    granted.append(0x80)
+                    continue
+                qos = min(qos, 1)
+                session.subscriptions[topic_filter] = qos
+                granted.append(qos)
+                new_filters.append((topic_filter, qos))
+            session.send(_packet(SUBACK, 0, struct.pack("!H", pid) + bytes(granted)))
+            for topic_filter, qos in new_filters:
+                for topic, (payload, retained_qos) in list(self.retained.items()):
+                    if topic_matches(topic_filter, topic):
+                        session.deliver(topic, payload, min(qos, retained_qos), retain=True)
+        elif packet_type == UNSUBSCRIBE:
+            pid = r.u16()
+            while r.remaining():
+                session.subscriptions.pop(r.string(), None)
+            session.send(_packet(UNSUBACK, 0, struct.pack("!H", pid)))
+        elif packet_type == PINGREQ:
+            session.send(_packet(PINGRESP, 0))
+        else:
+            raise ProtocolError(f"Unexpected packet type {packet_type}")
+
+    def _drop(self, session, publish_will):
+        if self.sessions.get(session.client_id) is session:
+            del self.sessions[session.client_id]
+        session.close()
+        if publish_will and session.will:
+            topic, payload, qos, retain = session.will
+            session.will = None
+            self.publish(topic, payload, min(qos, 1), retain)
+
+    # Routing
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        """Route a message to every matching subscriber. Must run on the broker loop."""
+        if isinstance(payload, str):
+            payload = payload.encode()
+        qos = min(qos, 1)
+        if retain:
+            if payload:
+                self.retained[topic] = (payload, qos)
+            else:
+                self.retained.pop(topic, None)
+        for session in list(self.sessions.values()):
+            best = -1
+            for topic_filter, sub_qos in session.subscriptions.items():
+                if sub_qos > best and topic_matches(topic_filter, topic):
+                    best = sub_qos
+            if best >= 0:
+                session.deliver(topic, payload, min(qos, best))
+
+    def publish_threadsafe(self, topic, payload, qos=0, retain=False):
+        self.loop.call_soon_threadsafe(self.publish, topic, payload, qos, retain)
@@ -0,0 +1,145 @@
+import os
+import struct
+import time
+
+from engine import PHASES
+from metrics import REGISTRY
+from ruleset import RULESETS
+
+# Crash recovery for a table.
+#
+# GameEngine saves a snapshot() each time it settles into a phase, in a
+# compact binary layout: a 23 byte header plus 12 bytes per player, so a
+# full table is a few hundred bytes and a save costs one small write. The
+# file is replaced atomically (write a temp file, fsync, rename), so a
+# crash leaves either the previous checkpoint or the new one, never half.
+#
+#   header  magic, version, rules name, phase (index in engine.PHASES),
+#           flags, round, max rounds, pick (NONE if not made yet), player count
+#   player  id, health, state, bet, last input, flags, role index
+
+MAGIC = b"GRCP"
+VERSION = 1
+NONE = -0x8000  # None for the signed fields
+
+_HEADER = struct.Struct("<4sB8sBBHHhH")
+_PLAYER = struct.Struct("<HhBhhBH")
+
+_STARTED = 1
+_ACCEPTING = 2
+_IDLE = 1
+
+# fsync every save. Turn off to trade crash safety for speed on slow storage.
+FSYNC = True
+
+
+def _opt(value):
+    return NONE if value is None else value
+
+
+def _unopt(value):
+    return None if value == NONE else value
+
+
+def encode(snapshot):
+    """Pack a GameEngine.snapshot() into bytes."""
+    flags = (_STARTED if snapshot["started"] else 0) | (_ACCEPTING if snapshot["accepting_players"] else 0)
+    players = snapshot["players"]
+    parts = [_HEADER.pack(MAGIC, VERSION, snapshot["rules"].encode(), PHASES.index(snapshot["phase"]),
+                          flags, snapshot["round"], snapshot["max_rounds"], _opt(snapshot["picker_num"]),
+                          len(players))]
+    for player_id, health, state, bet, last_input, idle, order in players:
+        parts.append(_PLAYER.pack(player_id, health, state, _opt(bet), _opt(last_input),
+                                  _IDLE if idle else 0, order))
+    return b"".join(parts)
+
+
+def decode(data):
+    """Unpack bytes from encode(). Raises ValueError if they aren't a checkpoint."""
+    try:
+        magic, version, rules, phase, flags, round_, max_rounds, picker_num, count = _HEADER.unpack_from(data)
+    except struct.error:
+        raise ValueError("Truncated checkpoint header")
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a version {VERSION} checkpoint")
+    if len(data) != _HEADER.size + count * _PLAYER.size:
+        raise ValueError("Truncated checkpoint")
+    rules = rules.rstrip(b"\0").decode()
+    if rules not in RULESETS:
+        raise ValueError(f"Unknown rule set {rules!r}")
+    players = []
+    for player_id, health, state, bet, last_input, player_flags, order in _PLAYER.iter_unpack(data[_HEADER.size:]):
+        players.append((player_id, health, state, _unopt(bet), _unopt(last_input),
+                        bool(player_flags & _IDLE), order))
+    return {
+        "rules": rules,
+        "max_rounds": max_rounds,
+        "round": round_,
+        "started": bool(flags & _STARTED),
+        "accepting_players": bool(flags & _ACCEPTING),
+        "phase": PHASES[phase],
+        "picker_num": _unopt(picker_num),
+        "players": players,
+    }
+
+
+def path_for(directory, table=None):
+    """Checkpoint file for a table, e.g. table.bin or table-3.bin."""
+    return os.path.join(directory, "table.bin" if table is None else f"table-{table}.bin")
+
+
+class Checkpoint:
+    """The checkpoint file of one table."""
+
+    def __init__(self, path, fsync=FSYNC, metrics=REGISTRY):
+        self.path = path
+        self.fsync = fsync
+        self.saves = metrics.counter("checkpoint.saves")
+        self.errors = metrics.counter("checkpoint.errors")
+        self.size = metrics.gauge("checkpoint.bytes")
+        self.latency = metrics.histogram("checkpoint.save")
+
+    def save(self, snapshot):
+        started = time.perf_counter()
+        try:
+            data = encode(snapshot)
+        except struct.error as e:
+            # A value outside the binary layout, e.g. health beyond int16
+            self.errors.inc()
+            print(f"Error encoding checkpoint {self.path}: {e}")
+            return
+        temp = self.path + ".tmp"
+        try:
+            with open(temp, "wb") as f:
+                f.write(data)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(temp, self.path)
+        except OSError as e:
+            # Losing a checkpoint must never stop the game
+            self.errors.inc()
+            print(f"Error saving checkpoint {self.path}: {e}")
+            return
+        self.saves.inc()
+        self.size.set(len(data))
+        self.latency.observe(time.perf_counter() - started)
+
+    def load(self):
+        """The saved snapshot, or None if there is no usable checkpoint."""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            return decode(data)
+        except ValueError as e:
+            print(f"Ignoring checkpoint {self.path}: {e}")
+            return None
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
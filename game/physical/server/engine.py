@@ -0,0 +1,628 @@
+import random
+import time
+
+import messages
+from metrics import REGISTRY
+from players import Player, PlayerRegistry, PlayerState
+from scheduler import SubmissionSet
+import ruleset
+import wheel
+from scoring import score_guessers
+
+# Seconds each input phase waits before idle players are auto-submitted.
+# A round therefore never takes longer than their sum.
+PHASE_DEADLINES = {
+    "Picking": 60,
+    "Guessing/Betting": 60,
+}
+
+# What an idle player submits when a deadline fires, per input kind:
+#   "random"  - a random value in the rule set's input range
+#   "last"    - the player's previous input (random if there is none)
+#   "forfeit" - a missed pick abandons the round, a missed guess loses the
+#               furthest distance possible from the pick (both guessers if
+#               both miss), a missed bet sits out
+TIMEOUT_POLICIES = {
+    "pick": "random",
+    "guess": "forfeit",
+    "bet": "forfeit",
+}
+POLICIES = ("random", "last", "forfeit")
+# Seconds the winner is shown before every remote is switched off
+WIN_DISPLAY = 15
+# Seconds a player who drops mid-game keeps their health and role
+RECONNECT_GRACE = 60
+# Roles are revealed when the console reports its wheel animation done, or
+# this many seconds after the animation should have ended if it never does
+REVEAL_GRACE = 2
+
+# Client id of the console, which never plays
+CONSOLE_ID = 0
+
+
+class GameState:
+    def __init__(self, rules=ruleset.DEFAULT):
+        self.rules = rules
+        self.clients = {}
+        self.max_rounds = 1
+        self.players = PlayerRegistry()
+        self.started = False
+        self.console_connected = False
+        self.accepting_players = True
+        self.phase = Phase.LOBBY
+
+
+class Phase:
+    LOBBY = "Lobby"
+    ROLE_PICK = "RolePick"
+    PICKING = "Picking"
+    GUESSING = "Guessing/Betting"
+    SCORING = "Scoring"
+    GAME_OVER = "GameOver"
+
+
+# Phases the engine rests in waiting for players; it checkpoints on entering
+# each. Role pick and scoring never outlast the message that started them.
+CHECKPOINT_PHASES = (Phase.LOBBY, Phase.PICKING, Phase.GUESSING, Phase.GAME_OVER)
+
+# Every phase. Checkpoints store a phase as its index here, so only append
+PHASES = (Phase.LOBBY, Phase.ROLE_PICK, Phase.PICKING, Phase.GUESSING, Phase.SCORING, Phase.GAME_OVER)
+# Phase duration bucket upper bounds in seconds; phases wait on people
+PHASE_BUCKETS = (0.01, 0.1, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+class GameEngine:
+    """Round logic as an explicit phase state machine.
+
+    Nothing here blocks or polls: inbound messages call the on_* methods and
+    phase timeouts arrive as scheduler deadlines. Both must be delivered on
+    one thread (the server's message pump), so many engines can share a
+    process without a thread each.
+
+    `out` is anything with send_message(client_id, type, data, **extra) and
+    send_encoded(client_id, prepared), normally a server.Table. `checkpoint`,
+    if given, is a checkpoint.Checkpoint the engine saves a snapshot() to
+    whenever it enters one of CHECKPOINT_PHASES.
+    """
+
+    def __init__(self, state, out, scheduler, on_change=None, deadlines=None, policies=None,
+                 metrics=REGISTRY, checkpoint=None):
+        self.state = state
+        self.out = out
+        self.scheduler = scheduler
+        self.on_change = on_change
+        self.checkpoint = checkpoint
+        self.deadlines = dict(PHASE_DEADLINES, **(deadlines or {}))
+        self.policies = dict(TIMEOUT_POLICIES, **(policies or {}))
+        for kind, policy in self.policies.items():
+            if policy not in POLICIES:
+                raise ValueError(f"Unknown timeout policy {policy!r} for {kind}")
+        self.deadlines_fired = metrics.counter("engine.deadlines_fired")
+        self.auto_submits = metrics.counter("engine.auto_submits")
+        self.phase_time = dict((phase, metrics.histogram(f"engine.phase.{phase}", PHASE_BUCKETS))
+                               for phase in PHASES)
+
+        self.phase = Phase.LOBBY
+        self.phase_started = time.monotonic()
+        # (phase, seconds) for each phase finished since the round began
+        self.round_phases = []
+        self.deadline = None
+        self.round = 0
+
+        # Player tracking, shared with the GUI through the game state
+        self.players = state.players
+        self.departed = {}  # client id -> (Player, grace Deadline)
+        self.picker = None
+        self.guessers = []
+        self.betters = []
+
+        # Round state
+        self.picker_num = None
+        self.guesser_nums = [None, None]
+        self.guesser_wheel = None
+        # Whether this round's wheels fake a stop
+        self.picker_fake = False
+        self.guesser_fake = False
+        self.submissions = SubmissionSet()
+        # One [reveal or None, fallback Deadline] per wheel animation the
+        # console is playing, oldest first; and how many reveals went out
+        # this round
+        self.reveals = []
+        self.revealed = 0
+        self.wheel_free_at = 0.0
+
+    @property
+    def rules(self):
+        return self.state.rules
+
+    # Phase bookkeeping
+
+    def enter(self, phase, timeout=None, on_timeout=None):
+        self.scheduler.cancel(self.deadline)
+        self.deadline = None
+        now = time.monotonic()
+        spent = now - self.phase_started
+        self.phase_time[self.phase].observe(spent)
+        # Replaced, not cleared, so a reader on another thread sees whole rounds
+        self.round_phases = [] if phase == Phase.ROLE_PICK else self.round_phases + [(self.phase, spent)]
+        self.phase_started = now
+        self.phase = phase
+        self.state.phase = phase
+        if timeout is not None:
+            self.deadline = self.scheduler.call_later(timeout, self._expire, phase, on_timeout)
+        if self.checkpoint is not None and phase in CHECKPOINT_PHASES:
+            self.checkpoint.save(self.snapshot())
+        if self.on_change:
+            self.on_change(phase)
+
+    def _expire(self, phase, on_timeout):
+        # A deadline can fire just after its phase ended; ignore it then
+        if self.phase == phase:
+            self.deadline = None
+            on_timeout()
+
+    # Membership events
+
+    def on_join(self, client_id):
+        if client_id == CONSOLE_ID:
+            self.resync_console()
+            return
+        if client_id in self.players:
+            return
+        departed = self.departed.pop(client_id, None)
+        if departed is not None:
+            # Back within the grace window: same health and role as before
+            player, grace = departed
+            self.scheduler.cancel(grace)
+            print(f"Player {client_id} rejoined")
+            self.players.add(player)
+            self.resync(player)
+        else:
+            self.players.add(Player(client_id, self.rules.max_health))
+
+    def on_leave(self, client_id):
+        player = self.players.remove(client_id)
+        if player is None:
+            return
+        if self.state.started:
+            grace = self.scheduler.call_later(RECONNECT_GRACE, self.forget, client_id)
+            self.departed[client_id] = (player, grace)
+
+    def forget(self, client_id):
+        departed = self.departed.pop(client_id, None)
+        if departed is not None:
+            self.scheduler.cancel(departed[1])
+            print(f"Player {client_id} did not return")
+
+    def reset_players(self):
+        for client_id in list(self.departed):
+            self.forget(client_id)
+        for player in self.players:
+            player.health = self.rules.max_health
+            player.state = PlayerState.DEFAULT
+            player.bet = None
+            player.idle = False
+
+    # Snapshots, for checkpoints and moving a table between processes
+
+    def snapshot(self):
+        """Players, progress and the round in flight as plain data.
+
+        Each player is (id, health, state, bet, last_input, idle, order),
+        where order is a guesser's or better's 1-based role index. During a
+        round a better's bet is the one already submitted, if any.
+        """
+        in_round = self.phase in (Phase.PICKING, Phase.GUESSING)
+        order = {}
+        for i, player in enumerate(self.guessers):
+            order[player.id] = i + 1
+        for i, player in enumerate(self.betters):
+            order[player.id] = i + 1
+        rows = []
+        for player in list(self.players) + [player for player, _ in self.departed.values()]:
+            bet = player.bet
+            if in_round and player.state == PlayerState.BETTER:
+                bet = self.submissions.values.get(("bet", player.id))
+            rows.append((player.id, player.health, player.state, bet, player.last_input,
+                         player.idle, order.get(player.id, 0)))
+        return {
+            "rules": self.rules.name,
+            "max_rounds": self.state.max_rounds,
+            "round": self.round,
+            "started": self.state.started,
+            "accepting_players": self.state.accepting_players,
+            "phase": self.phase,
+            "picker_num": self.picker_num if in_round else None,
+            "players": rows,
+        }
+
+    def restore(self, snapshot):
+        """Take over a table from snapshot(). Its players rejoin with the same
+        health and role as their retained presence arrives, or are forgotten
+        after the reconnect grace. A round in flight resumes with fresh
+        deadlines; bets entered since the snapshot have to be entered again."""
+        self.state.rules = ruleset.RULESETS[snapshot["rules"]]
+        self.state.max_rounds = snapshot["max_rounds"]
+        self.state.started = snapshot["started"]
+        self.state.accepting_players = snapshot["accepting_players"]
+        self.round = snapshot["round"]
+        guessers = {}
+        betters = {}
+        for player_id, health, player_state, bet, last_input, idle, order in snapshot["players"]:
+            player = Player(player_id, health)
+            player.state = player_state
+            player.bet = bet
+            player.last_input = last_input
+            player.idle = idle
+            grace = self.scheduler.call_later(RECONNECT_GRACE, self.forget, player_id)
+            self.departed[player_id] = (player, grace)
+            if player_state == PlayerState.PICKER:
+                self.picker = player
+            elif player_state == PlayerState.GUESSER:
+                guessers[order] = player
+            elif player_state == PlayerState.BETTER:
+                betters[order] = player
+        self.guessers = [guessers[i] for i in sorted(guessers)]
+        self.betters = [betters[i] for i in sorted(betters)]
+
+        phase = snapshot["phase"]
+        if phase in (Phase.PICKING, Phase.GUESSING) and self.picker is not None:
+            self.expect_round()
+            # Players saw their roles before the restart; resync resends them
+            self.revealed = 2
+            for better in self.betters:
+                if better.bet is not None:
+                    self.submissions.submit(("bet", better.id), better.bet)
+            if phase == Phase.PICKING:
+                self.enter(Phase.PICKING, self.deadlines[Phase.PICKING], self.on_picking_timeout)
+            else:
+                self.picker_num = snapshot["picker_num"]
+                self.submissions.submit(("pick", self.picker.id), self.picker_num)
+                self.enter(Phase.GUESSING, self.deadlines[Phase.GUESSING], self.on_guessing_timeout)
+        elif phase == Phase.GAME_OVER:
+            self.enter(Phase.GAME_OVER, WIN_DISPLAY, self.finish)
+        else:
+            self.enter(Phase.LOBBY)
+
+    def stop(self):
+        """Cancel the phase and reconnect deadlines, e.g. when the table moves
+        to another process."""
+        self.scheduler.cancel(self.deadline)
+        self.deadline = None
+        for _, fallback in self.reveals:
+            self.scheduler.cancel(fallback)
+        self.reveals = []
+        for _, grace in self.departed.values():
+            self.scheduler.cancel(grace)
+
+    def resync(self, player):
+        """Send a returning remote its health and, if it still owes an input
+        this phase, its role."""
+        if not self.state.started:
+            return
+        self.out.send_message(player.id, "health", health=player.health)
+        values = self.submissions.values
+        role = None
+        if player.state == PlayerState.DEAD:
+            role = f"{PlayerState.DEAD}"
+        elif player is self.picker and self.phase == Phase.PICKING and self.revealed >= 1:
+            role = f"{PlayerState.PICKER}"
+        elif player in self.guessers and self.phase == Phase.GUESSING and self.revealed >= 2:
+            index = self.guessers.index(player) + 1
+            if ("guess", index) not in values:
+                role = f"{PlayerState.GUESSER}+{index}"
+        elif player in self.betters and ("bet", player.id) not in values and self.revealed >= 1:
+            role = f"{PlayerState.BETTER}+{self.betters.index(player) + 1}"
+        if role is not None:
+            self.out.send_message(player.id, "role", role)
+
+    def resync_console(self):
+        if self.phase == Phase.PICKING:
+            self.light_wheel(self.picker.id, fake=self.picker_fake)
+        elif self.phase == Phase.GUESSING:
+            self.light_wheel([g.id for g in self.guessers], self.guesser_wheel, fake=self.guesser_fake)
+
+    # Lobby
+
+    def start(self):
+        if self.phase not in (Phase.LOBBY, Phase.GAME_OVER):
+            return
+        if self.phase == Phase.GAME_OVER:
+            # Fresh health and roles for a new game
+            self.reset_players()
+        self.state.started = True
+        self.state.accepting_players = False
+        if len(self.players) < 3:
+            self.handle_not_enough_players()
+            return
+        self.round = 0
+        self.begin_round()
+
+    def handle_not_enough_players(self):
+        print("Not enough players to start game")
+        self.state.started = False
+        self.state.accepting_players = True
+        self.enter(Phase.LOBBY)
+
+    # Round flow
+    #
+    # Rounds are pipelined so only human input is on the critical path.
+    # Every role is chosen when the round starts and the guessers' wheel
+    # animation is encoded then too. Wheel animations never gate a phase:
+    # the console queues the guessers' animation behind the picker's the
+    # moment the pick arrives, and scoring rolls straight into the next
+    # round. Roles stay hidden until the wheel showing them has stopped, so
+    # the animation is still the reveal (see light_wheel).
+
+    def begin_round(self):
+        if self.check_win_conditions():
+            return
+        self.round += 1
+        print(f"Starting round {self.round}")
+        self.enter(Phase.ROLE_PICK)
+        if not self.select_roles():
+            self.game_over()
+            return
+
+        self.expect_round()
+        self.begin_picking()
+
+    def expect_round(self):
+        # Stage everything the pick will trigger. Fake stops are rolled here
+        # and sent with each wheel so the console needs no randomness of its own
+        self.picker_fake = random.random() < wheel.FAKE_CHANCE
+        self.guesser_fake = random.random() < wheel.FAKE_CHANCE
+        self.guesser_wheel = messages.prepare("light_wheel", [g.id for g in self.guessers], fake=self.guesser_fake)
+        keys = [("pick", self.picker.id)]
+        keys += [("guess", i + 1) for i in range(len(self.guessers))]
+        keys += [("bet", better.id) for better in self.betters]
+        self.submissions.expect(keys)
+
+    def begin_picking(self):
+        self.enter(Phase.PICKING, self.deadlines[Phase.PICKING], self.on_picking_timeout)
+        self.light_wheel(self.picker.id, reveal=self.assign_roles, fake=self.picker_fake)
+
+    def on_pick(self, client_id, value):
+        if self.phase != Phase.PICKING:
+            return
+        if client_id is not None and client_id != self.picker.id:
+            return
+        if not self.submissions.submit(("pick", self.picker.id), value):
+            return
+        self.record_input(self.picker, value)
+        self.picker_num = value
+        self.begin_guessing()
+
+    def begin_guessing(self):
+        self.enter(Phase.GUESSING, self.deadlines[Phase.GUESSING], self.on_guessing_timeout)
+        # Console plays this right after the picker's animation
+        self.light_wheel([g.id for g in self.guessers], self.guesser_wheel, self.assign_guesser_roles,
+                         self.guesser_fake)
+        # Bets may all be in already
+        self._check_submissions()
+
+    def light_wheel(self, choice, prepared=None, reveal=None, fake=False):
+        """Send the console light_wheel `choice` ("off", an LED or a pair),
+        pre-encoded as `prepared` if given, faking a stop if `fake`. The
+        console plays them in order and acks every one with "done", so each
+        gets an entry in reveals. `reveal` runs on that "done", or REVEAL_GRACE after the animation's
+        length (queued behind any still playing) if it never comes."""
+        if prepared is not None:
+            self.out.send_encoded(CONSOLE_ID, prepared)
+        else:
+            self.out.send_message(CONSOLE_ID, "light_wheel", choice, fake=fake)
+        if not self.state.console_connected:
+            if reveal is not None:
+                reveal()
+            return
+        try:
+            length = 0.0 if choice == "off" else wheel.duration(wheel.timeline(choice, fake))
+        except ValueError:
+            length = 0.0  # An id with no LED; the console shows nothing
+        self.wheel_free_at = max(time.monotonic(), self.wheel_free_at) + length
+        pending = [reveal, None]
+        pending[1] = self.scheduler.call_at(self.wheel_free_at + REVEAL_GRACE, self._reveal_late, pending)
+        self.reveals.append(pending)
+
+    def on_wheel_done(self):
+        """The console finished the oldest animation it was sent."""
+        if self.reveals:
+            reveal, fallback = self.reveals.pop(0)
+            self.scheduler.cancel(fallback)
+            if reveal is not None:
+                reveal()
+
+    def _reveal_late(self, pending):
+        if pending in self.reveals:
+            self.reveals.remove(pending)
+            if pending[0] is not None:
+                pending[0]()
+
+    def cancel_reveals(self):
+        # The animations still play and report done, so keep their entries
+        # to match those up; only the reveals are dropped
+        for pending in self.reveals:
+            pending[0] = None
+        self.revealed = 0
+
+    def on_guess(self, client_id, index, value):
+        if self.phase == Phase.GUESSING and self.submissions.submit(("guess", index), value):
+            if 1 <= index <= len(self.guessers):
+                self.record_input(self.guessers[index - 1], value)
+            self._check_submissions()
+
+    def on_bet(self, client_id, value):
+        # Betters have their role from the end of the picker's wheel
+        if self.phase in (Phase.PICKING, Phase.GUESSING) and self.submissions.submit(("bet", client_id), value):
+            self.record_input(self.players.get(client_id), value)
+            self._check_submissions()
+
+    def _check_submissions(self):
+        if self.phase == Phase.GUESSING and self.submissions.complete:
+            self.finalize_round()
+
+    def record_input(self, player, value):
+        if player is not None:
+            player.last_input = value
+            player.idle = False
+
+    # Deadlines
+
+    def auto_value(self, kind, player):
+        """The value the timeout policy submits for an idle player, or None to forfeit."""
+        policy = self.policies[kind]
+        if policy == "forfeit":
+            return None
+        if policy == "last" and player.last_input is not None:
+            return player.last_input
+        return random.randint(0, self.rules.input_max)
+
+    def auto_submit(self, key, player, value):
+        self.submissions.submit(key, value)
+        self.auto_submits.inc()
+        player.idle = True
+        print(f"Player {player.id} idle, submitted {value} for {key[0]}")
+
+    def on_picking_timeout(self):
+        self.deadlines_fired.inc()
+        value = self.auto_value("pick", self.picker)
+        if value is None:
+            self.picker.idle = True
+            self.abandon_round({("pick", self.picker.id)})
+            return
+        self.auto_submit(("pick", self.picker.id), self.picker, value)
+        self.picker_num = value
+        self.begin_guessing()
+
+    def on_guessing_timeout(self):
+        self.deadlines_fired.inc()
+        missing = self.submissions.missing
+        for i, guesser in enumerate(self.guessers):
+            key = ("guess", i + 1)
+            if key in missing:
+                # None forfeits, scored in calculate_scores
+                self.auto_submit(key, guesser, self.auto_value("guess", guesser))
+        for better in self.betters:
+            key = ("bet", better.id)
+            if key in missing:
+                # None sits the round out
+                self.auto_submit(key, better, self.auto_value("bet", better))
+        self.finalize_round()
+
+    def finalize_round(self):
+        self.enter(Phase.SCORING)
+        self.light_wheel("off", messages.LIGHT_WHEEL_OFF)
+
+        values = self.submissions.values
+        self.guesser_nums = [values[("guess", i + 1)] for i in range(len(self.guessers))]
+        for better in self.betters:
+            better.bet = values[("bet", better.id)]
+
+        self.calculate_scores()
+        self.reset_round()
+        self.begin_round()
+
+    def abandon_round(self, missing):
+        print(f"Round {self.round} timed out waiting for {sorted(missing, key=str)}")
+        self.light_wheel("off", messages.LIGHT_WHEEL_OFF)
+        for player in self.guessers + self.betters + [self.picker]:
+            if player is not None and player.state != PlayerState.DEAD:
+                player.state = PlayerState.DEFAULT
+        self.reset_round()
+        self.begin_round()
+
+    def select_roles(self):
+        if self.players.alive_count < 3:
+            return False
+        players_c = self.players.alive
+
+        # Select picker
+        self.picker = random.choice(players_c)
+        players_c.remove(self.picker)
+        self.picker.state = PlayerState.PICKER
+
+        # Select guessers
+        self.guessers = random.sample(players_c, 2)
+        for guesser in self.guessers:
+            players_c.remove(guesser)
+            guesser.state = PlayerState.GUESSER
+
+        # Remaining players become betters
+        self.betters = players_c
+        for better in self.betters:
+            better.state = PlayerState.BETTER
+
+        return True
+
+    def assign_roles(self):
+        self.revealed = 1
+        # Assign picker
+        self.out.send_message(self.picker.id, "role", f"{PlayerState.PICKER}")
+
+        # Assign betters with index
+        for i, better in enumerate(self.betters):
+            self.out.send_message(better.id, "role", f"{PlayerState.BETTER}+{i+1}")
+
+    def assign_guesser_roles(self):
+        self.revealed = 2
+        for i, guesser in enumerate(self.guessers):
+            self.out.send_message(guesser.id, "role", f"{PlayerState.GUESSER}+{i+1}")
+
+    def calculate_scores(self):
+        # A forfeit costs the furthest distance possible from the pick
+        forfeit = max(self.picker_num, self.rules.input_max - self.picker_num)
+        healths = score_guessers(self.picker_num, self.guesser_nums,
+                                 [g.health for g in self.guessers], self.rules.max_health, forfeit)
+        for guesser, health in zip(self.guessers, healths):
+            guesser.health = health
+
+        # Live tables keep the plain loop: at a table's handful of betters it
+        # beats copying Player objects into arrays, which only pays off from
+        # around 100 players (see tests/bench/scoring.py). PlayerArrays is
+        # for party mode and simulation.
+        bet_delta = self.rules.bet_delta
+        for better in self.betters:
+            if better.bet is not None:
+                better.health += bet_delta(self.picker_num, better.bet)
+
+        # Only guessers and betters can change health this round
+        for player in self.guessers + self.betters:
+            self.out.send_message(player.id, "health", health=player.health)
+
+            if player.health <= 0:
+                player.state = PlayerState.DEAD
+                self.out.send_message(player.id, "role", f"{PlayerState.DEAD}")
+
+    def reset_round(self):
+        self.picker = None
+        self.guessers = []
+        self.betters = []
+        self.picker_num = None
+        self.guesser_nums = [None, None]
+        self.submissions.clear()
+        self.cancel_reveals()
+
+    # Game over
+
+    def check_win_conditions(self):
+        if self.players.alive_count < 3 or self.round >= self.state.max_rounds:
+            self.game_over()
+            return True
+        return False
+
+    def game_over(self):
+        alive_players = self.players.alive
+        self.enter(Phase.GAME_OVER, WIN_DISPLAY, self.finish)
+        if alive_players:
+            winner = max(alive_players, key=lambda p: p.health)
+            print(f"Player {winner.id} wins")
+            self.out.send_encoded(winner.id, messages.WIN)
+
+    def finish(self):
+        for player in self.players:
+            self.out.send_encoded(player.id, messages.OFF)
+        self.state.started = False
+        self.state.accepting_players = True
+        # A finished game has nothing to resume
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
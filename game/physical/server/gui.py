@@ -0,0 +1,558 @@
+import math
+import queue
+import random
+import time
+import tkinter as tk
+from tkinter import messagebox
+from tkinter import ttk
+
+import messages
+import ruleset
+import wheel
+from engine import PlayerState
+from perfpanel import PerformancePanel
+
+# Milliseconds between drains of the update queue. However many updates
+# arrive in between, the GUI repaints at most once per frame.
+FRAME_MS = 50
+
+# Treeview tags for client_list rows
+IDLE_TAGS = ("idle",)
+NO_TAGS = ()
+
+
+def spinner_geometry(center_x=137, center_y=137, radius=100, label_offset=25):
+    """Decagon vertices and, per edge, the LED centre, its label position and
+    the physical LED number, for the virtual spinner."""
+    # Rotate everything 90 degrees (π/2)
+    rotation = math.pi / 2
+
+    vertices = []
+    leds = []
+    for i in range(10):
+        # Vertex angles (with rotation)
+        angle = (i * 2 * math.pi / 10) - (math.pi / 10) + rotation
+        vertices.append((center_x + radius * math.cos(angle), center_y + radius * math.sin(angle)))
+
+        # LEDs sit in the middle of the edges, labels further out
+        led_angle = i * 2 * math.pi / 10 + rotation
+        x = center_x + radius * math.cos(led_angle)
+        y = center_y + radius * math.sin(led_angle)
+        # Physical LED numbers run counterclockwise from lower-left
+        led_number = (8 - i) % 10 + 1
+        leds.append((x, y, x + label_offset * math.cos(led_angle), y + label_offset * math.sin(led_angle),
+                     led_number))
+    return vertices, leds
+
+
+# Computed once; the canvas items are created once when the advanced view is built
+SPINNER = spinner_geometry()
+SPINNER_LED_RADIUS = 8
+
+
+class GUI:
+    def __init__(self, gamestate, wifi, server):
+        self.state = gamestate
+        self.wifi = wifi
+        self.server = server
+
+        # Create main window
+        self.root = tk.Tk()
+        self.root.title("Guess Roulette Server")
+
+        # Shared by both views, so switching keeps the round count and status
+        self.players_var = tk.StringVar(value="Players: 0")
+        self.round_count = tk.StringVar(value="1")
+        self.game_status = tk.StringVar(value="Stopped")
+
+        self.ROLE_MAP = {
+            "Default": PlayerState.DEFAULT,
+            "Picker": PlayerState.PICKER,
+            "Guesser": PlayerState.GUESSER,
+            "Better": PlayerState.BETTER,
+            "Dead": PlayerState.DEAD
+        }
+        self.ROLE_NAMES = dict((state, name) for name, state in self.ROLE_MAP.items())
+        # Role column text by (state, idle)
+        self.ROLE_LABELS = {}
+        for state, name in self.ROLE_NAMES.items():
+            self.ROLE_LABELS[(state, False)] = name
+            self.ROLE_LABELS[(state, True)] = name + " (idle)"
+
+        self.status = None
+        self.console_frame = None
+        self.console_light = None
+        self.console_status = None
+        self.client_list = None
+        self.spin_job = None
+        # Player id -> (values, tags) currently shown in client_list
+        self.client_rows = {}
+
+        self.root.protocol("WM_DELETE_WINDOW", self._on_closing)
+
+        # Tk is only touched from its own thread. Other threads post to this
+        # queue and the frame tick applies whatever has piled up.
+        self.updates = queue.SimpleQueue()
+        self.updates_posted = server.metrics.counter("gui.updates")
+        self.repaints = server.metrics.counter("gui.repaints")
+        self.repaint_time = server.metrics.histogram("gui.repaint")
+        # How late each frame tick runs, i.e. how busy the Tk loop is
+        self.lag = server.metrics.histogram("gui.lag")
+        self.frame_due = time.monotonic() + FRAME_MS / 1000
+        self.root.after(FRAME_MS, self._frame)
+
+        # Each view is built the first time it is shown and then only hidden
+        self.simple_view = None
+        self.advanced_view = None
+        self.view = None
+        self.switch_to_simple()
+
+    def post_update(self):
+        """Ask for a repaint. Safe from any thread; never touches Tk."""
+        self.updates.put(True)
+        self.updates_posted.inc()
+
+    def _frame(self):
+        now = time.monotonic()
+        self.lag.observe(max(0.0, now - self.frame_due))
+        pending = False
+        while True:
+            try:
+                pending = self.updates.get_nowait() or pending
+            except queue.Empty:
+                break
+        if pending:
+            with self.repaint_time.time():
+                self.update_gui()
+            self.repaints.inc()
+        self.frame_due = time.monotonic() + FRAME_MS / 1000
+        self.root.after(FRAME_MS, self._frame)
+
+    def _on_closing(self):
+        print("Closing server...")
+        # Close socket properly
+        try:
+            #self.game_sock.shutdown(socket.SHUT_RDWR)
+            #self.game_sock.close()
+            # Force close port on Windows
+            #os.system(f'netsh int ipv4 delete excludedportrange protocol=tcp startport=8080 numberofports=1')
+            self.wifi.stop_hotspot()
+        except Exception as e:
+            print(f"Error closing socket: {e}")
+        # Ends mainloop; Game closes the server and the checkpoint stays on
+        # disk for the next start
+        self.root.destroy()
+
+    def setup_gui(self):
+        # Main container
+        main = ttk.Frame(self.root, padding="10")
+
+        # Status Section
+        status = ttk.LabelFrame(main, text="Status", padding="5")
+        status.grid(row=0, column=0, sticky="ew", pady=5)
+
+        # Console status with circle
+        self.console_light = tk.Canvas(status, width=20, height=20)
+        self.console_light.grid(row=0, column=0, padx=5)
+        self.indicator = self.console_light.create_oval(2, 2, 18, 18, fill='red')
+        ttk.Label(status, text="Console").grid(row=0, column=1, padx=5)
+
+        # Player count
+        ttk.Label(status, textvariable=self.players_var).grid(row=0, column=2, padx=20)
+
+        ttk.Label(status, text="Limited Mode Enabled!", foreground="red").grid(row=0, column=3, padx=20) if self.state.rules is ruleset.LIMITED else None
+
+        # Game Controls
+        controls = ttk.LabelFrame(main, text="Game Controls", padding="5")
+        controls.grid(row=1, column=0, sticky="ew", pady=5)
+
+        # Start button and round counter
+        ttk.Button(controls, text="Start Game",
+                   command=self.start_game).grid(row=0, column=0, padx=5)
+
+        # Round counter
+        round_frame = ttk.Frame(controls)
+        round_frame.grid(row=0, column=1, padx=20)
+        ttk.Label(round_frame, text="Rounds:").pack(side=tk.LEFT)
+        ttk.Button(round_frame, text="-",
+                   command=lambda: self.change_rounds(-1)
+                   ).pack(side=tk.LEFT, padx=2)
+        ttk.Label(round_frame, textvariable=self.round_count).pack(side=tk.LEFT, padx=5)
+        ttk.Button(round_frame, text="+",
+                   command=lambda: self.change_rounds(1)
+                   ).pack(side=tk.LEFT, padx=2)
+
+        # Advanced mode button (small, right side)
+        ttk.Button(main, text="A", width=3,
+                   command=self.switch_to_advanced).grid(row=0, column=1,
+                                                         sticky="ne", padx=5, pady=5)
+        return main
+
+    def switch_to_advanced(self):
+        if self.advanced_view is None:
+            self.advanced_view = self.setup_advanced_gui()
+        self.show_view(self.advanced_view, "Guess Roulette Server - Advanced")
+
+    def switch_to_simple(self):
+        if self.simple_view is None:
+            self.simple_view = self.setup_gui()
+        self.show_view(self.simple_view, "Guess Roulette Server - Simple")
+
+    def show_view(self, view, title):
+        if self.view is not None and self.view is not view:
+            self.view.grid_remove()
+        view.grid(row=0, column=0, sticky="nsew")
+        self.view = view
+        self.root.title(title)
+        # Latency probes only feed the performance panel
+        if view is self.advanced_view:
+            self.server.server.start_probes()
+        else:
+            self.server.server.stop_probes()
+        # The newly shown view may have missed updates while hidden
+        self.post_update()
+
+    def setup_advanced_gui(self):
+        # Main container
+        main = ttk.Frame(self.root, padding="10")
+
+        # Configure grid weights
+        self.root.grid_rowconfigure(0, weight=1)
+        self.root.grid_columnconfigure(0, weight=1)
+        main.grid_rowconfigure(1, weight=1)
+        main.grid_columnconfigure(0, weight=1)
+
+        # Status Bar
+        status = ttk.LabelFrame(main, text="Server Status", padding="5")
+        status.grid(row=0, column=0, columnspan=5, sticky="ew", pady=5)
+
+        self.console_frame = ttk.Frame(status)
+        self.console_frame.grid(row=0, column=0, sticky="w", padx=5)
+        ttk.Label(self.console_frame, text="Console:").grid(row=0, column=0, padx=5)
+        self.console_status = ttk.Label(self.console_frame, text="Disconnected", foreground="red")
+        self.console_status.grid(row=0, column=1)
+
+        # Game status
+        ttk.Label(status, text="Game:").grid(row=0, column=2, padx=5)
+        ttk.Label(status, textvariable=self.game_status).grid(row=0, column=3)
+
+        # Player count
+        ttk.Label(status, textvariable=self.players_var).grid(row=0, column=4, padx=20)
+
+        ttk.Label(status, text="Limited Mode Enabled!", foreground="red").grid(row=0, column=5, padx=20) if self.state.rules is ruleset.LIMITED else None
+
+        # Client Section
+        clients = ttk.LabelFrame(main, text="Connected Clients", padding="5")
+        clients.grid(row=1, column=0, sticky="nsew", padx=5)
+        clients.grid_rowconfigure(0, weight=1)
+        clients.grid_columnconfigure(0, weight=1)
+
+        # Client list with scrollbar
+        client_scroll = ttk.Scrollbar(clients)
+        client_scroll.grid(row=0, column=1, sticky="ns")
+
+        self.client_list = ttk.Treeview(clients,
+                                        columns=("ID", "Role", "Health", "Pick"),
+                                        selectmode="browse",
+                                        yscrollcommand=client_scroll.set)
+        self.client_list.grid(row=0, column=0, sticky="nsew")
+        client_scroll.config(command=self.client_list.yview)
+
+        # Configure columns
+        self.client_list.column("#0", width=0, stretch=False)  # Hide first column
+        self.client_list.column("ID", width=50)
+        self.client_list.column("Role", width=100)
+        self.client_list.column("Health", width=70)
+        self.client_list.column("Pick", width=50)
+
+        # Configure headings
+        self.client_list.heading("ID", text="ID")
+        self.client_list.heading("Role", text="Role")
+        self.client_list.heading("Health", text="Health")
+        self.client_list.heading("Pick", text="Pick")
+
+        # Configure row height
+        style = ttk.Style()
+        style.configure('Treeview', rowheight=25)
+        # Players a phase deadline had to submit for
+        self.client_list.tag_configure("idle", foreground="orange")
+
+        ttk.Button(clients, text="Refresh", command=self.update_client_list).grid(row=1, column=0, pady=5)
+
+        # Game Control Section
+        controls = ttk.LabelFrame(main, text="Game Controls", padding="5")
+        controls.grid(row=1, column=1, sticky="nsew", padx=5)
+
+        # Game control buttons
+        control_buttons = ttk.Frame(controls)
+        control_buttons.grid(row=0, column=0, columnspan=2, pady=5)
+        ttk.Button(control_buttons, text="Start Game",
+                   command=self.start_game).pack(side=tk.LEFT, padx=5)
+
+        # Round counter
+        round_frame = ttk.Frame(controls)
+        round_frame.grid(row=1, column=0, columnspan=2, pady=5)
+        ttk.Label(round_frame, text="Rounds:").pack(side=tk.LEFT, padx=5)
+        ttk.Button(round_frame, text="-",
+                   command=lambda: self.change_rounds(-1)
+                   ).pack(side=tk.LEFT)
+        ttk.Label(round_frame, textvariable=self.round_count).pack(side=tk.LEFT, padx=5)
+        ttk.Button(round_frame, text="+",
+                   command=lambda: self.change_rounds(1)
+                   ).pack(side=tk.LEFT)
+
+        # Spinner controls
+        spinner_frame = ttk.Frame(controls)
+        spinner_frame.grid(row=2, column=0, columnspan=2, pady=5)
+        ttk.Label(spinner_frame, text="Wheel ID:").pack(side=tk.LEFT, padx=5)
+        self.wheel_id = tk.StringVar()
+        ttk.Entry(spinner_frame, textvariable=self.wheel_id, width=5).pack(side=tk.LEFT, padx=5)
+        ttk.Button(spinner_frame, text="Spin",
+                   command=self.spin_wheel).pack(side=tk.LEFT, padx=5)
+        ttk.Button(spinner_frame, text="Lights Off",
+                   command=self.lights_off).pack(side=tk.LEFT, padx=5)
+
+        # Enhanced virtual spinner
+        spinner_frame = ttk.LabelFrame(controls, text="Virtual Spinner")
+        spinner_frame.grid(row=0, column=0, columnspan=2, pady=5)
+
+        self.spinner_canvas = tk.Canvas(spinner_frame, width=275, height=275)
+        self.spinner_canvas.grid(row=0, column=0)
+        self.draw_virtual_spinner(self.spinner_canvas)
+
+
+        # Game State Section
+        game_state = ttk.LabelFrame(main, text="Game State", padding="5")
+        game_state.grid(row=2, column=0, columnspan=2, sticky="ew", pady=5)
+
+        # Client Control Panel
+        client_controls = ttk.LabelFrame(game_state, text="Client Controls", padding="5")
+        client_controls.grid(row=3, column=0, columnspan=2, pady=5)
+
+        # Client ID selector
+        id_frame = ttk.Frame(client_controls)
+        id_frame.grid(row=0, column=0, padx=5, pady=5)
+        ttk.Label(id_frame, text="Client ID:").pack(side=tk.LEFT)
+        self.client_id = tk.StringVar()
+        ttk.Entry(id_frame, textvariable=self.client_id, width=5).pack(side=tk.LEFT, padx=5)
+
+        # Health control
+        health_frame = ttk.Frame(client_controls)
+        health_frame.grid(row=0, column=1, padx=5, pady=5)
+        ttk.Label(health_frame, text="Health:").pack(side=tk.LEFT)
+        self.health_val = tk.StringVar()
+        ttk.Entry(health_frame, textvariable=self.health_val, width=5).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(client_controls, text="Update Client", 
+            command=self.update_client).grid(row=0, column=2, padx=5)
+
+
+        # Command Section
+        cmd_frame = ttk.LabelFrame(main, text="Manual Commands", padding="5")
+        cmd_frame.grid(row=3, column=0, columnspan=2, sticky="ew", pady=5)
+        # Command boxes with labels
+        ttk.Label(cmd_frame, text="Command:").grid(row=0, column=0, padx=2)
+        self.cmd_entry = ttk.Entry(cmd_frame)
+        self.cmd_entry.grid(row=0, column=1, sticky="ew", padx=5)
+        
+        ttk.Label(cmd_frame, text="Client ID:").grid(row=0, column=2, padx=2)
+        self.client_entry = ttk.Entry(cmd_frame, width=5)
+        self.client_entry.grid(row=0, column=3, sticky="w", padx=5)
+        
+        # Send buttons with fixed one-liner command
+            # Then modify the button command:
+        ttk.Button(cmd_frame, text="Send",
+                command=lambda: self.handle_command_send()
+        ).grid(row=0, column=4, padx=5)
+        
+        ttk.Button(cmd_frame, text="Send All", 
+                  command=self.send_all
+        ).grid(row=0, column=5, padx=5)
+
+        # Rates, latencies and lag from the metrics registries
+        self.performance = PerformancePanel(main, self.server, self.root)
+        self.performance.grid(row=1, column=2, rowspan=3, sticky="nsew", padx=5)
+
+        ttk.Button(main, text="S", width=3,
+                   command=self.switch_to_simple).grid(row=0, column=2,
+                                                       sticky="ne", padx=5, pady=5)
+        return main
+        
+    def update_client(self):
+        try:
+            client_id = int(self.client_id.get())
+            health = int(self.health_val.get())
+            
+            if health <= 0:
+                messagebox.showerror("Error", "Health must be positive")
+                return
+
+            # Find and update player
+            player = self.state.players.get(client_id)
+            if player:
+                # Players belong to the message thread; the row repaints
+                # once it has applied the change
+                self.server.post(self.set_health, player, health)
+            else:
+                messagebox.showerror("Error", f"Client {client_id} not found")
+
+        except ValueError:
+            messagebox.showerror("Error", "Invalid input")
+
+    def set_health(self, player, health):
+        player.health = health
+        self.server.send_message(player.id, "health", health=health)
+        self.post_update()
+        
+    def handle_command_send(self, id=None, command=None):
+        client_id = self.client_entry.get() if id is None else id
+        command = self.cmd_entry.get() if id is None else command
+        
+        # Parse command and data
+        cmd_parts = command.split(':')
+        self.server.send_message(client_id, cmd_parts[0], cmd_parts[1] if len(cmd_parts) > 1 else None)
+
+    def draw_virtual_spinner(self, canvas):
+        vertices, leds = SPINNER
+
+        # Draw decagon edges
+        for i in range(10):
+            next_i = (i + 1) % 10
+            canvas.create_line(vertices[i][0], vertices[i][1],
+                               vertices[next_i][0], vertices[next_i][1],
+                               fill='gray')
+
+        # Draw LEDs with counterclockwise numbering from lower-left
+        self.leds = {}
+        for i, (x, y, label_x, label_y, led_number) in enumerate(leds):
+            led = canvas.create_oval(
+                x - SPINNER_LED_RADIUS, y - SPINNER_LED_RADIUS,
+                x + SPINNER_LED_RADIUS, y + SPINNER_LED_RADIUS,
+                fill='gray', tags=f'led{i}'
+            )
+            self.leds[led_number - 1] = led  # Store with 0-based index
+            canvas.create_text(label_x, label_y, text=str(led_number))
+
+    def animate_wheel(self, choice, fake=False):
+        """Play the wheel timeline for `choice` (an LED number or a pair) on
+        the virtual spinner, faking a stop if `fake`. Runs from after()
+        callbacks, so Tk stays responsive; a new spin cancels the one in
+        progress."""
+        self.cancel_spin()
+        frames = wheel.timeline(choice, fake)
+        self.spin_started = time.monotonic()
+        self._spin_step(frames, 0)
+
+    def _spin_step(self, frames, i):
+        elapsed = time.monotonic() - self.spin_started
+        # Apply every keyframe that is due, so a late tick catches up
+        # instead of stretching the animation
+        while i < len(frames) and frames[i][2] <= elapsed:
+            led, on, _ = frames[i]
+            self.spinner_canvas.itemconfig(self.leds[led - 1], fill='red' if on else 'gray')
+            i += 1
+        if i < len(frames):
+            delay = max(1, int((frames[i][2] - elapsed) * 1000))
+            self.spin_job = self.root.after(delay, self._spin_step, frames, i)
+        else:
+            self.spin_job = None
+
+    def cancel_spin(self):
+        """Stop any spin in progress and turn the virtual LEDs off."""
+        if self.spin_job is not None:
+            self.root.after_cancel(self.spin_job)
+            self.spin_job = None
+        for led in self.leds.values():
+            self.spinner_canvas.itemconfig(led, fill='gray')
+
+    def lights_off(self):
+        self.cancel_spin()
+        # Through the engine, which matches the console's "done" to each wheel
+        self.server.post(self.server.game.engine.light_wheel, "off", messages.LIGHT_WHEEL_OFF)
+
+    def update_console_status(self):
+        # Both views stay alive, so keep whichever have been built current
+        connected = self.state.console_connected
+        if self.console_light is not None:
+            self.console_light.itemconfig(self.indicator, fill='green' if connected else 'red')
+        if self.console_status is not None:
+            if connected:
+                self.console_status.configure(text="Connected", foreground="green")
+            else:
+                self.console_status.configure(text="Disconnected", foreground="red")
+
+    def send(self, client_id, message):
+        self.handle_command_send(client_id, message)
+
+    def change_rounds(self, delta):
+        rounds = max(1, int(self.round_count.get()) + delta)
+        self.round_count.set(str(rounds))
+        self.state.max_rounds = rounds
+
+    def start_game(self):
+        self.server.broadcast_message("start")
+        # The engine only runs on the message thread
+        self.server.post(self.server.game.engine.start)
+
+    def send_all(self):
+        self.server.broadcast_message(self.cmd_entry.get())
+
+    def spin_wheel(self):
+        try:
+            if "," in self.wheel_id.get():
+                choice = [int(x) for x in self.wheel_id.get().split(",")]
+                if len(choice) != 2:
+                    raise ValueError(choice)
+            else:
+                choice = int(self.wheel_id.get())
+            # The console plays the same timeline from the same message
+            fake = random.random() < wheel.FAKE_CHANCE
+            self.animate_wheel(choice, fake)
+            self.server.post(self.server.game.engine.light_wheel, choice, None, None, fake)
+        except ValueError:
+            print("Invalid wheel ID")
+
+    def client_row(self, player):
+        values = (
+            player.id,
+            self.ROLE_LABELS.get((player.state, player.idle), "Default"),
+            player.health,
+            ""  # Pick column always empty in server view
+        )
+        return values, IDLE_TAGS if player.idle else NO_TAGS
+
+    def update_client_list(self):
+        """Patch client_list to match the players, touching only rows whose
+        values changed. Rows are keyed by player id."""
+        if self.client_list is None:
+            return
+
+        rows = {}
+        for player in self.state.players:
+            if player.id != 0 and player.id in self.state.clients:  # Skip console
+                rows[player.id] = self.client_row(player)
+
+        shown = self.client_rows
+        for player_id in shown.keys() - rows.keys():
+            self.client_list.delete(player_id)
+        for player_id, row in rows.items():
+            old = shown.get(player_id)
+            if old == row:
+                continue
+            values, tags = row
+            if old is None:
+                self.client_list.insert("", "end", iid=player_id, values=values, tags=tags)
+            else:
+                self.client_list.item(player_id, values=values, tags=tags)
+        self.client_rows = rows
+
+    def update_gui(self):
+        self.players_var.set(f"Players: {len(self.state.clients) - (1 if self.state.console_connected else 0)}")
+        self.update_console_status()
+        self.update_client_list()
+        # State is the source of truth, e.g. a restored checkpoint's rounds
+        if self.round_count.get() != str(self.state.max_rounds):
+            self.round_count.set(str(self.state.max_rounds))
+        self.game_status.set(self.state.phase)
+        if not self.state.started:
+            self.send(0, f"clients:[{self.state.clients.keys()}]")
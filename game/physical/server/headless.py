@@ -0,0 +1,154 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+# Codec shared with the Pico firmware
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+
+from checkpoint import Checkpoint, path_for
+from engine import GameEngine, GameState
+from server import GameServer
+
+# Headless entry point: the game server without the Windows hotspot,
+# the registry tweak or the Tk GUI, so it runs on any box with Python and
+# paho. Control it through HeadlessGame or the stdin commands in main().
+
+
+class HeadlessGame:
+    """GameServer and GameEngine with a small control API instead of a GUI.
+
+    The methods are safe to call from any thread; anything touching the
+    engine runs on the server's message pump. Pass an existing GameServer
+    and a table name to host another table on the same connection.
+
+    With `checkpoint_dir` the table checkpoints into that directory and
+    picks up its saved game on start, unless given a `snapshot` to restore.
+    """
+
+    def __init__(self, bind_address="127.0.0.1", port=1883, broker="embedded", rounds=1,
+                 table=None, server=None, checkpoint_dir=None, snapshot=None):
+        started = time.perf_counter()
+        self.state = GameState()
+        self.state.max_rounds = rounds
+        self.phase_changed = threading.Condition()
+        self.owns_server = server is None
+        self.server = server or GameServer(bind_address, port, broker)
+        self.table = self.server.add_table(table, self, self.state)
+        self.checkpoint = None
+        if checkpoint_dir is not None:
+            self.checkpoint = Checkpoint(path_for(checkpoint_dir, table), metrics=self.table.metrics)
+            if snapshot is None:
+                snapshot = self.checkpoint.load()
+        self.engine = GameEngine(self.state, self.table, self.server.scheduler, on_change=self._on_change,
+                                 metrics=self.table.metrics, checkpoint=self.checkpoint)
+        if snapshot is not None:
+            self.engine.restore(snapshot)
+            where = f"table {table} " if table is not None else ""
+            print(f"Resumed {where}round {self.engine.round} ({self.engine.phase}) from checkpoint "
+                  f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+        if self.owns_server:
+            self.server.connect()
+        self.startup_time = time.perf_counter() - started
+        if self.owns_server:
+            print(f"Headless server ready in {self.startup_time * 1000:.0f} ms")
+
+    def refresh(self):
+        # No GUI to update
+        pass
+
+    def _on_change(self, phase):
+        with self.phase_changed:
+            self.phase_changed.notify_all()
+
+    def call(self, func, *args):
+        """Run `func(*args)` on the message pump and return its result."""
+        return self.server.call(func, *args)
+
+    def start_game(self, rounds=None):
+        if rounds is not None:
+            self.state.max_rounds = rounds
+        self.table.broadcast_message("start")
+        self.table.post(self.engine.start)
+
+    def wait_for(self, phase, timeout=None):
+        """Block until the engine enters `phase`. Returns False on timeout."""
+        with self.phase_changed:
+            return self.phase_changed.wait_for(lambda: self.engine.phase == phase, timeout)
+
+    def status(self):
+        def snapshot():
+            return {
+                "phase": self.engine.phase,
+                "round": self.engine.round,
+                "clients": sorted(self.state.clients),
+                "players": [(p.id, p.state, p.health) for p in self.engine.players],
+            }
+        return self.call(snapshot)
+
+    def close(self):
+        self.engine.stop()
+        if self.owns_server:
+            self.server.close()
+        else:
+            self.server.remove_table(self.table.name)
+
+    @property
+    def players(self):
+        return self.engine.players
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Guess Roulette server without a GUI")
+    parser.add_argument("--bind", default="0.0.0.0", help="broker address to listen on or connect to")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--broker", choices=("embedded", "external"), default="embedded",
+                        help="run the in-process broker or connect to a running one")
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--tables", type=int, default=0,
+                        help="host this many tables on game/<n>/... topics instead of one on game/...")
+    parser.add_argument("--checkpoint-dir", help="checkpoint tables here and resume their games on start")
+    args = parser.parse_args()
+
+    if args.tables:
+        server = GameServer(args.bind, args.port, args.broker)
+        games = [HeadlessGame(rounds=args.rounds, table=str(n + 1), server=server,
+                              checkpoint_dir=args.checkpoint_dir)
+                 for n in range(args.tables)]
+        server.connect()
+    else:
+        server = None
+        games = [HeadlessGame(args.bind, args.port, args.broker, args.rounds,
+                              checkpoint_dir=args.checkpoint_dir)]
+    print("Commands: start [rounds], status, quit")
+    try:
+        while True:
+            try:
+                line = input().split()
+            except EOFError:
+                break
+            if not line:
+                continue
+            if line[0] == "start":
+                for game in games:
+                    game.start_game(int(line[1]) if len(line) > 1 else None)
+            elif line[0] == "status":
+                for game in games:
+                    label = f"{game.table.name}: " if game.table.name is not None else ""
+                    print(f"{label}{game.status()}")
+            elif line[0] == "quit":
+                break
+            else:
+                print(f"Unknown command: {line[0]}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for game in games:
+            game.close()
+        if server:
+            server.close()
+
+
+if __name__ == "__main__":
+    main()
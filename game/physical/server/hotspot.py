@@ -0,0 +1,243 @@
+import atexit
+import ctypes
+import signal
+import subprocess
+import sys
+import time
+import winreg
+from tkinter import messagebox
+
+# Windows mobile hotspot control (PowerShell + registry). Only the GUI entry
+# point imports this; headless.py runs without it.
+
+
+def is_admin():
+    try:
+        return ctypes.windll.shell32.IsUserAnAdmin()
+    except:
+        return False
+
+
+def restart_as_admin():
+    if not is_admin():
+        print("Requesting admin privileges...")
+        ctypes.windll.shell32.ShellExecuteW(
+            None,
+            "runas",
+            sys.executable,
+            " ".join(['"' + sys.argv[0] + '"'] + sys.argv[1:]),
+            None,
+            1
+        )
+        sys.exit()
+
+def setup_wifi_peers_registry():
+    reg_path = r"SYSTEM\CurrentControlSet\Services\icssvc\Settings"
+    key_name = "WifiMaxPeers"
+    default_value = 10
+    
+    try:
+        # Try to open the key first
+        key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, reg_path, 0, 
+                            winreg.KEY_READ | winreg.KEY_WRITE)
+    except WindowsError:
+        # Key doesn't exist, create it
+        key = winreg.CreateKey(winreg.HKEY_LOCAL_MACHINE, reg_path)
+        messagebox.showwarning("Warning", "A reg key changing the number of devices that can connect to your PC's hotspot has been created or edited. Please restart your computer to apply changes!")
+    
+    try:
+        # Try to read existing value
+        value, _ = winreg.QueryValueEx(key, key_name)
+    except WindowsError:
+        # Value doesn't exist, create it
+        winreg.SetValueEx(key, key_name, 0, winreg.REG_DWORD, default_value)
+        messagebox.showwarning("Warning", "A reg key changing the number of devices that can connect to your PC's hotspot has been created or edited. Please restart your computer to apply changes! This program will now exit.")
+        sys.exit()
+    
+    winreg.CloseKey(key)
+
+class WiFiHotspot:
+    def __init__(self):
+        if not is_admin():
+            restart_as_admin()
+        self.original_ssid = None
+        self.original_key = None
+        self.original_band = None
+        self._get_original_settings()
+
+        # Register cleanup handlers
+        signal.signal(signal.SIGINT, self._cleanup)
+        signal.signal(signal.SIGTERM, self._cleanup)
+        atexit.register(self._cleanup)
+
+    def _cleanup(self, *args):
+        print("\nCleaning up hotspot...")
+        self.stop_hotspot()
+        sys.exit(0)
+
+    @staticmethod
+    def get_hotspot_ip():
+        ps_command = '''
+        Get-NetAdapter | 
+        Where-Object {$_.Name -like "*Local Area Connection*" -and $_.Status -eq "Up"} |
+        Get-NetIPAddress -AddressFamily IPv4 |
+        Select-Object IPAddress |
+        Format-Table -HideTableHeaders
+        '''
+        result = subprocess.run(["powershell", "-Command", ps_command],
+                                capture_output=True, text=True)
+        ip = result.stdout.strip()
+        print(f"Hotspot IP: {ip}")
+        return ip if ip else "192.168.137.1"  # Fallback to default
+
+    def _get_original_settings(self):
+        ps_command = '''
+        Add-Type -AssemblyName System.Runtime.WindowsRuntime
+        $TetheringManager = [Windows.Networking.NetworkOperators.NetworkOperatorTetheringManager,Windows.Networking.NetworkOperators,ContentType=WindowsRuntime]
+        $connectionProfile = [Windows.Networking.Connectivity.NetworkInformation,Windows.Networking.Connectivity,ContentType=WindowsRuntime]::GetInternetConnectionProfile()
+        $manager = $TetheringManager::CreateFromConnectionProfile($connectionProfile)
+        $config = $manager.GetCurrentAccessPointConfiguration()
+        Write-Host "SSID:$($config.Ssid)"
+        Write-Host "KEY:$($config.Passphrase)"
+        Write-Host "BAND:$($config.Band)"
+        '''
+        result = subprocess.run(["powershell", "-Command", ps_command], capture_output=True, text=True)
+        for line in result.stdout.splitlines():
+            if line.startswith("SSID:"):
+                self.original_ssid = line[5:].strip()
+            elif line.startswith("KEY:"):
+                self.original_key = line[4:].strip()
+            elif line.startswith("BAND:"):
+                self.original_band = line[5:].strip() or "TwoPointFourGigahertz"
+
+    def start_hotspot(self, ssid="GuessRoulette", key="password123", restart_mosquitto=True):
+        if not is_admin():
+            print("❌ Admin privileges required")
+            return False
+
+        try:
+            if self._test_network():
+                self.stop_hotspot()
+            # The Mosquitto service would hold port 1883 that the embedded broker needs
+            mosquitto_restart = "net stop mosquitto; net start mosquitto" if restart_mosquitto else "net stop mosquitto"
+            ps_command = f'''
+            $ErrorActionPreference = 'SilentlyContinue'
+            Add-Type -AssemblyName System.Runtime.WindowsRuntime
+            
+            $connectionProfile = [Windows.Networking.Connectivity.NetworkInformation,Windows.Networking.Connectivity,ContentType=WindowsRuntime]::GetInternetConnectionProfile()
+            if ($null -eq $connectionProfile) {{
+                Write-Error "No active network connection found"
+                exit 1
+            }}
+            Write-Host "Found active network profile"
+
+            $TetheringManager = [Windows.Networking.NetworkOperators.NetworkOperatorTetheringManager,Windows.Networking.NetworkOperators,ContentType=WindowsRuntime]
+            $manager = $TetheringManager::CreateFromConnectionProfile($connectionProfile)
+            if ($null -eq $manager) {{
+                Write-Error "Failed to create tethering manager"
+                exit 1
+            }}
+            Write-Host "Created tethering manager"
+            
+            # Configure hotspot
+            $config = $manager.GetCurrentAccessPointConfiguration()
+            $config.Ssid = "{ssid}"
+            $config.Passphrase = "{key}"
+            $config.Band = [Windows.Networking.NetworkOperators.TetheringWiFiBand]::TwoPointFourGigahertz
+            $config.MaxClientCount = 12
+            Write-Host "Configured hotspot settings"
+            
+            # Apply configuration (errors suppressed)
+            $null = $manager.ConfigureAccessPointAsync($config).AsTask().Wait()
+            Write-Host "Applied configuration"
+            
+            # Start hotspot (errors suppressed)
+            $null = $manager.StartTetheringAsync().AsTask().Wait()
+            Write-Host "Started tethering"
+
+            New-NetFirewallRule -DisplayName "Mosquitto MQTT" -Direction Inbound -Protocol TCP -LocalPort 1883 -Action Allow
+
+            {mosquitto_restart}
+            
+            # Restore error preference
+            $ErrorActionPreference = 'Continue'
+            '''
+
+            print(f"Starting Mobile Hotspot with SSID: {ssid}")
+            result = subprocess.run(["powershell", "-Command", ps_command],
+                                    capture_output=True, text=True)
+            print(f"Setup output: {result.stdout}")
+            if result.stderr:
+                print(f"Setup errors: {result.stderr}")
+
+            time.sleep(2)
+            ip = self.get_hotspot_ip()
+            print(f"""
+            Network Ready:
+            SSID: {ssid}
+            Password: {key}
+            IP: {ip}
+            Port: 8080
+            """)
+            return self._test_network()
+
+        except Exception as e:
+            print(f"✗ Hotspot error: {str(e)}")
+            return False
+
+    def _test_network(self):
+        # Test network adapter
+        ps_command = '''
+        $network = Get-NetAdapter | Where-Object {$_.Name -like "*Local*"} | Select-Object Status
+        Write-Host $network.Status
+        '''
+        result = subprocess.run(["powershell", "-Command", ps_command],
+                                capture_output=True, text=True)
+        if "Up" not in result.stdout:
+            print("✗ Network is not active")
+            return False
+        print("✓ Network is active")
+        return True
+
+
+    def stop_hotspot(self):
+        if not is_admin():
+            print("❌ Admin privileges required")
+            return False
+        try:
+            ps_command = f'''
+            Add-Type -AssemblyName System.Runtime.WindowsRuntime
+            
+            $connectionProfile = [Windows.Networking.Connectivity.NetworkInformation,Windows.Networking.Connectivity,ContentType=WindowsRuntime]::GetInternetConnectionProfile()
+            $TetheringManager = [Windows.Networking.NetworkOperators.NetworkOperatorTetheringManager,Windows.Networking.NetworkOperators,ContentType=WindowsRuntime]
+            $manager = $TetheringManager::CreateFromConnectionProfile($connectionProfile)
+            
+            # Stop tethering first
+            $manager.StopTetheringAsync()
+            Write-Host "Tethering stopped"
+            
+            # Reset configuration if we have original settings
+            if ("{self.original_ssid}" -ne "" -and "{self.original_key}" -ne "") {{
+                $config = $manager.GetCurrentAccessPointConfiguration()
+                $config.Ssid = "{self.original_ssid}"
+                $config.Passphrase = "{self.original_key}"
+                $config.Band = [Windows.Networking.NetworkOperators.TetheringWiFiBand]::"{self.original_band}"
+                $null = $manager.ConfigureAccessPointAsync($config)
+                Write-Host "Reset to original settings"
+            }}
+            '''
+
+            print("Stopping Mobile Hotspot...")
+            result = subprocess.run(["powershell", "-Command", ps_command],
+                                    capture_output=True, text=True)
+            print(f"Stop output: {result.stdout}")
+            if result.stderr:
+                print(f"Stop errors: {result.stderr}")
+
+            self._test_network()
+
+            return True
+
+        except Exception as e:
+            print(f"✗ Stop hotspot error: {str(e)}")
+            return False
@@ -0,0 +1,59 @@
+import json
+from functools import lru_cache
+
+import wire
+
+# Outbound message encoding. Messages are built from native values and
+# serialized exactly once; small, frequently repeated payloads are cached.
+
+
+@lru_cache(maxsize=512)
+def _encode_cached(msg_type, data, extra):
+    payload = {"type": msg_type, "data": data}
+    payload.update(extra)
+    return json.dumps(payload, separators=(",", ":"))
+
+
+def encode_message(msg_type, data=None, **extra):
+    """Serialize a {"type", "data", **extra} message to a JSON string."""
+    try:
+        return _encode_cached(msg_type, data, tuple(extra.items()))
+    except TypeError:
+        # Unhashable data (e.g. a list of wheel ids) skips the cache
+        payload = {"type": msg_type, "data": data}
+        payload.update(extra)
+        return json.dumps(payload, separators=(",", ":"))
+
+
+@lru_cache(maxsize=512)
+def _encode_binary_cached(msg_type, data, extra):
+    return wire.encode_binary(msg_type, 0, data, **dict(extra))
+
+
+def encode_for(codec, msg_type, data=None, **extra):
+    """Encode for a client's negotiated codec.
+
+    Messages without a binary layout fall back to JSON, which every
+    client can decode.
+    """
+    if codec == wire.BINARY:
+        try:
+            try:
+                return _encode_binary_cached(msg_type, data, tuple(extra.items()))
+            except TypeError:
+                return wire.encode_binary(msg_type, 0, data, **extra)
+        except (ValueError, TypeError):
+            pass
+    return encode_message(msg_type, data, **extra)
+
+
+def prepare(msg_type, data=None, **extra):
+    """Pre-encode a fixed message once for every codec."""
+    return {codec: encode_for(codec, msg_type, data, **extra) for codec in wire.CODECS}
+
+
+# Pre-encoded payloads the game sends every round
+LIGHT_WHEEL_OFF = prepare("light_wheel", "off")
+WIN = prepare("win")
+OFF = prepare("off")
+START = prepare("start")
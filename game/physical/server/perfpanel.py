@@ -0,0 +1,197 @@
+import collections
+import time
+import tkinter as tk
+from tkinter import ttk
+
+from metrics import REGISTRY
+
+# Live performance panel for the advanced GUI.
+#
+# Everything shown is read from the metrics registries once per sample:
+# message counters become rates, latency histograms become the mean of what
+# was observed since the previous sample. Each sparkline is one canvas line
+# item created up front; a sample only moves its points with coords(), so
+# redrawing costs the same however long the GUI has been open.
+
+# Milliseconds between samples
+SAMPLE_MS = 1000
+# Sparkline size in pixels and samples shown (one per STEP pixels)
+SPARK_WIDTH = 120
+SPARK_HEIGHT = 24
+STEP = 2
+# Client rows are flagged when their last probe round trip is slower than
+# this many seconds, or nothing has been heard from them for STALE_AFTER
+SLOW_RTT = 0.25
+STALE_AFTER = 15
+
+SLOW_TAGS = ("slow",)
+NO_TAGS = ()
+
+
+class Rate:
+    """Per-second rate of a counter between samples."""
+
+    def __init__(self, counter):
+        self.counter = counter
+        self.last = counter.value
+
+    def sample(self, elapsed):
+        value = self.counter.value
+        rate = (value - self.last) / elapsed if elapsed > 0 else 0.0
+        self.last = value
+        return rate
+
+
+class Window:
+    """Mean of a histogram's observations between samples, in milliseconds.
+    Holds the previous value when nothing new was observed."""
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.count = histogram.count
+        self.total = histogram.total
+        self.value = 0.0
+
+    def sample(self, elapsed):
+        count, total = self.histogram.count, self.histogram.total
+        if count > self.count:
+            self.value = (total - self.total) / (count - self.count) * 1000
+        self.count, self.total = count, total
+        return self.value
+
+
+class Sparkline:
+    """A label, the latest value and a line of recent values on a canvas."""
+
+    def __init__(self, parent, row, label, source, unit):
+        self.source = source
+        self.unit = unit
+        self.history = collections.deque([0.0] * (SPARK_WIDTH // STEP + 1), maxlen=SPARK_WIDTH // STEP + 1)
+        self.text = tk.StringVar(value="-")
+        ttk.Label(parent, text=label).grid(row=row, column=0, sticky="w", padx=5)
+        self.canvas = tk.Canvas(parent, width=SPARK_WIDTH, height=SPARK_HEIGHT, highlightthickness=0)
+        self.canvas.grid(row=row, column=1, padx=5, pady=1)
+        self.line = self.canvas.create_line(0, SPARK_HEIGHT, SPARK_WIDTH, SPARK_HEIGHT, fill="steelblue")
+        ttk.Label(parent, textvariable=self.text, width=12).grid(row=row, column=2, sticky="e", padx=5)
+
+    def sample(self, elapsed):
+        value = self.source.sample(elapsed)
+        self.history.append(value)
+        self.text.set(f"{value:.1f} {self.unit}")
+        top = max(self.history) or 1.0
+        scale = (SPARK_HEIGHT - 2) / top
+        points = []
+        for i, v in enumerate(self.history):
+            points.append(i * STEP)
+            points.append(SPARK_HEIGHT - 1 - v * scale)
+        self.canvas.coords(self.line, *points)
+
+
+class PerformancePanel:
+    """Message rates, latencies and loop lag as sparklines, per-client message
+    rates, round trip and last-seen age, and the current round's phase
+    durations for `table` (a server.Table). Process-wide metrics come from
+    REGISTRY."""
+
+    def __init__(self, parent, table, root):
+        self.table = table
+        self.root = root
+        metrics = table.metrics
+        self.frame = ttk.LabelFrame(parent, text="Performance", padding="5")
+
+        sparks = ttk.Frame(self.frame)
+        sparks.grid(row=0, column=0, sticky="ew")
+        series = (
+            ("Inbound", Rate(table.router.received), "msg/s"),
+            ("Outbound", Rate(table.sent), "msg/s"),
+            ("Broker RTT", Window(REGISTRY.histogram("broker.rtt")), "ms"),
+            ("Broker loop lag", Window(REGISTRY.histogram("broker.loop_lag")), "ms"),
+            ("GUI loop lag", Window(metrics.histogram("gui.lag")), "ms"),
+            ("Timer lag", Window(REGISTRY.histogram("scheduler.lag")), "ms"),
+            ("Pump wait", Window(REGISTRY.histogram("pump.wait")), "ms"),
+        )
+        self.sparklines = [Sparkline(sparks, row, label, source, unit)
+                           for row, (label, source, unit) in enumerate(series)]
+
+        # Phases of the current round, finished ones first
+        self.phases = tk.StringVar(value="")
+        ttk.Label(self.frame, textvariable=self.phases, wraplength=360, justify=tk.LEFT).grid(
+            row=1, column=0, sticky="w", pady=5)
+
+        self.client_list = ttk.Treeview(self.frame, columns=("ID", "In", "Out", "RTT", "p99", "Seen"),
+                                        show="headings", height=6, selectmode="none")
+        self.client_list.grid(row=2, column=0, sticky="nsew")
+        for column, text, width in (("ID", "ID", 40), ("In", "In/s", 50), ("Out", "Out/s", 50),
+                                    ("RTT", "RTT ms", 60), ("p99", "p99 ms", 60), ("Seen", "Seen s ago", 70)):
+            self.client_list.column(column, width=width)
+            self.client_list.heading(column, text=text)
+        self.client_list.tag_configure("slow", foreground="red")
+        self.frame.grid_rowconfigure(2, weight=1)
+        # Client id -> (values, tags) currently shown
+        self.client_rows = {}
+        # Client id -> (inbound Rate, outbound Rate)
+        self.client_rates = {}
+
+        self.last_sample = time.monotonic()
+        self.root.after(SAMPLE_MS, self.tick)
+
+    def grid(self, **options):
+        self.frame.grid(**options)
+
+    def tick(self):
+        now = time.monotonic()
+        elapsed = now - self.last_sample
+        self.last_sample = now
+        for sparkline in self.sparklines:
+            sparkline.sample(elapsed)
+        self.update_phases(now)
+        self.update_clients(now, elapsed)
+        self.root.after(SAMPLE_MS, self.tick)
+
+    def update_phases(self, now):
+        engine = self.table.game.engine
+        # Read the attributes once; the engine replaces them on its own thread
+        finished = engine.round_phases
+        phase, started = engine.phase, engine.phase_started
+        parts = [f"{name} {spent:.1f}s" for name, spent in finished]
+        parts.append(f"{phase} {now - started:.1f}s...")
+        self.phases.set(f"Round {engine.round}: " + ", ".join(parts))
+
+    def update_clients(self, now, elapsed):
+        table = self.table
+        rows = {}
+        rates = {}
+        for client_id in list(table.state.clients):
+            rates[client_id] = inbound, outbound = self.client_rates.get(client_id) or (
+                Rate(table.metrics.counter(f"client.{client_id}.received")),
+                Rate(table.metrics.counter(f"client.{client_id}.sent")))
+            rtt = table.rtt.get(client_id)
+            seen = table.router.last_seen.get(client_id)
+            age = now - seen if seen is not None else None
+            p99 = table.metrics.histogram(f"client.{client_id}.rtt").quantile(0.99) if rtt is not None else None
+            slow = (rtt is not None and rtt > SLOW_RTT) or (age is not None and age > STALE_AFTER)
+            values = (
+                "console" if client_id == 0 else client_id,
+                f"{inbound.sample(elapsed):.1f}",
+                f"{outbound.sample(elapsed):.1f}",
+                f"{rtt * 1000:.0f}" if rtt is not None else "-",
+                f"{p99 * 1000:.0f}" if p99 is not None else "-",
+                f"{age:.0f}" if age is not None else "-",
+            )
+            rows[client_id] = (values, SLOW_TAGS if slow else NO_TAGS)
+        self.client_rates = rates
+
+        # Same keyed patching as GUI.update_client_list
+        shown = self.client_rows
+        for client_id in shown.keys() - rows.keys():
+            self.client_list.delete(client_id)
+        for client_id, row in rows.items():
+            old = shown.get(client_id)
+            if old == row:
+                continue
+            values, tags = row
+            if old is None:
+                self.client_list.insert("", "end", iid=client_id, values=values, tags=tags)
+            else:
+                self.client_list.item(client_id, values=values, tags=tags)
+        self.client_rows = rows
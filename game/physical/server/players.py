@@ -0,0 +1,118 @@
+class PlayerState:
+    DEFAULT = 1
+    PICKER = 2
+    GUESSER = 3
+    BETTER = 4
+    DEAD = 5
+
+
+STATES = (PlayerState.DEFAULT, PlayerState.PICKER, PlayerState.GUESSER,
+          PlayerState.BETTER, PlayerState.DEAD)
+
+
+class Player:
+    def __init__(self, identifier: int, health: int):
+        self.id = identifier
+        self.health = health
+        self.bet = None
+        # Previous value this player entered, and whether the last deadline
+        # had to submit for them
+        self.last_input = None
+        self.idle = False
+        self._state = PlayerState.DEFAULT
+        self._registry = None
+
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, value):
+        old = self._state
+        self._state = value
+        if self._registry is not None:
+            self._registry._moved(self, old, value)
+
+
+class PlayerRegistry:
+    """Players keyed by id, with a secondary index per role.
+
+    Assigning `player.state` keeps the role indexes up to date, so lookups
+    by id or role and the alive/dead counts are O(1) however many players
+    a table has. Each role index keeps players in the order they were
+    given that role.
+    """
+
+    def __init__(self):
+        self._players = {}
+        self._by_state = dict((state, {}) for state in STATES)
+
+    def add(self, player):
+        if player.id in self._players:
+            self.remove(player.id)
+        self._players[player.id] = player
+        self._by_state[player.state][player.id] = player
+        player._registry = self
+        return player
+
+    def remove(self, player_id):
+        player = self._players.pop(player_id, None)
+        if player is not None:
+            self._by_state[player.state].pop(player_id, None)
+            player._registry = None
+        return player
+
+    def clear(self):
+        for player_id in list(self._players):
+            self.remove(player_id)
+
+    def _moved(self, player, old, new):
+        self._by_state[old].pop(player.id, None)
+        self._by_state[new][player.id] = player
+
+    def get(self, player_id):
+        return self._players.get(player_id)
+
+    def __contains__(self, player_id):
+        return player_id in self._players
+
+    def __len__(self):
+        return len(self._players)
+
+    def __iter__(self):
+        # Snapshot so the GUI thread can iterate while the pump mutates
+        return iter(list(self._players.values()))
+
+    def ids(self):
+        return list(self._players)
+
+    def with_state(self, state):
+        return list(self._by_state[state].values())
+
+    def count(self, state):
+        return len(self._by_state[state])
+
+    @property
+    def picker(self):
+        pickers = self._by_state[PlayerState.PICKER]
+        return next(iter(pickers.values())) if pickers else None
+
+    @property
+    def guessers(self):
+        return self.with_state(PlayerState.GUESSER)
+
+    @property
+    def betters(self):
+        return self.with_state(PlayerState.BETTER)
+
+    @property
+    def dead(self):
+        return self.with_state(PlayerState.DEAD)
+
+    @property
+    def alive(self):
+        return [p for p in self if p.state != PlayerState.DEAD]
+
+    @property
+    def alive_count(self):
+        return len(self._players) - len(self._by_state[PlayerState.DEAD])
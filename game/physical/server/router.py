@@ -0,0 +1,242 @@
+import queue
+import threading
+import time
+
+import wire
+from metrics import REGISTRY
+
+# Table-driven dispatch for inbound MQTT messages.
+#
+# Handlers are registered against a message type, optionally scoped to a
+# topic. Lookups are resolved once per (topic, type) pair and cached, so
+# dispatch is a single dict hit no matter how many handlers exist.
+
+
+def decode_payload(raw):
+    """Decode a JSON or binary MQTT payload into a dict, or None if it is neither."""
+    try:
+        return wire.decode(raw)
+    except ValueError:
+        return None
+
+
+class Route:
+    def __init__(self, name, handler, metrics):
+        self.name = name
+        self.handler = handler
+        self.calls = metrics.counter(f"router.{name}.calls")
+        self.errors = metrics.counter(f"router.{name}.errors")
+        self.latency = metrics.histogram(f"router.{name}.latency")
+
+    def __call__(self, client_id, data, payload):
+        start = time.perf_counter()
+        try:
+            self.handler(client_id, data, payload)
+        except Exception as e:
+            self.errors.inc()
+            print(f"Handler {self.name} error: {e}")
+        finally:
+            self.calls.inc()
+            self.latency.observe(time.perf_counter() - start)
+
+
+class TopicRouter:
+    def __init__(self, metrics=REGISTRY):
+        self.metrics = metrics
+        self.routes = {}      # (topic or None, msg_type) -> [Route]
+        self.topics = set()   # Topics to subscribe to
+        self._resolved = {}   # (topic, msg_type) -> tuple of Routes
+        self.last_seen = {}   # client id -> monotonic time of its last message
+        self.received_from = {}  # client id -> its client.<id>.received counter
+        self.received = metrics.counter("router.received")
+        self.unrouted = metrics.counter("router.unrouted")
+        self.malformed = metrics.counter("router.malformed")
+
+    def add(self, msg_type, handler, topic=None, name=None):
+        """Register `handler(client_id, data, payload)` for `msg_type`.
+
+        With `topic` the handler only fires for messages on that topic,
+        otherwise it fires for the type on any subscribed topic.
+        """
+        name = name or getattr(handler, "__name__", msg_type)
+        self.routes.setdefault((topic, msg_type), []).append(Route(name, handler, self.metrics))
+        if topic is not None:
+            self.topics.add(topic)
+        self._resolved.clear()
+
+    def listen(self, topic):
+        """Subscribe to a topic that only carries type-routed messages."""
+        self.topics.add(topic)
+
+    def subscribe(self, client, qos=1):
+        for topic in sorted(self.topics):
+            client.subscribe(topic, qos)
+
+    def resolve(self, topic, msg_type):
+        key = (topic, msg_type)
+        routes = self._resolved.get(key)
+        if routes is None:
+            routes = tuple(self.routes.get((None, msg_type), ())) + \
+                     tuple(self.routes.get((topic, msg_type), ()))
+            self._resolved[key] = routes
+        return routes
+
+    def dispatch(self, topic, payload):
+        """Route an already decoded payload. Returns the number of handlers run."""
+        routes = self.resolve(topic, payload.get("type"))
+        if not routes:
+            self.unrouted.inc()
+            return 0
+        client_id = payload.get("id")
+        data = payload.get("data")
+        self.received.inc()
+        if client_id is not None:
+            self.last_seen[client_id] = time.monotonic()
+            counter = self.received_from.get(client_id)
+            if counter is None:
+                counter = self.received_from[client_id] = self.metrics.counter(f"client.{client_id}.received")
+            counter.inc()
+        for route in routes:
+            route(client_id, data, payload)
+        return len(routes)
+
+    def on_message(self, client, userdata, msg):
+        """paho on_message callback: decode once and dispatch."""
+        payload = decode_payload(msg.payload)
+        if payload is None:
+            self.malformed.inc()
+            print(f"Unexpected payload format on {msg.topic}: {msg.payload!r}")
+            return
+        self.dispatch(msg.topic, payload)
+
+    def stats(self):
+        """Per-handler call counts and latency summaries, slowest first."""
+        rows = []
+        for routes in self.routes.values():
+            for route in routes:
+                rows.append({
+                    "handler": route.name,
+                    "calls": route.calls.value,
+                    "errors": route.errors.value,
+                    **route.latency.snapshot(),
+                })
+        rows.sort(key=lambda row: row["mean"] * row["calls"], reverse=True)
+        return rows
+
+
+class TableRouter:
+    """Splits traffic between per-table TopicRouters by the topic's table
+    segment (game/<table>/...). Topics without a known table segment go to
+    the unscoped table registered as None. Has the same dispatch interface
+    as TopicRouter, so a MessagePump can sit in front of either."""
+
+    def __init__(self, metrics=REGISTRY):
+        self.tables = {}  # table name or None -> TopicRouter
+        self.unrouted = metrics.counter("router.unrouted")
+        self.malformed = metrics.counter("router.malformed")
+
+    def add(self, table, router):
+        self.tables[table] = router
+
+    def remove(self, table):
+        return self.tables.pop(table, None)
+
+    @property
+    def topics(self):
+        return set().union(*(router.topics for router in self.tables.values()))
+
+    def subscribe(self, client, qos=1):
+        for router in list(self.tables.values()):
+            router.subscribe(client, qos)
+
+    def router_for(self, topic):
+        parts = topic.split("/", 2)
+        if len(parts) == 3 and parts[1] not in wire.CHANNELS:
+            # Unknown tables (e.g. one just migrated away) are dropped
+            return self.tables.get(parts[1])
+        return self.tables.get(None)
+
+    def dispatch(self, topic, payload):
+        router = self.router_for(topic)
+        if router is None:
+            self.unrouted.inc()
+            return 0
+        return router.dispatch(topic, payload)
+
+    def on_message(self, client, userdata, msg):
+        payload = decode_payload(msg.payload)
+        if payload is None:
+            self.malformed.inc()
+            print(f"Unexpected payload format on {msg.topic}: {msg.payload!r}")
+            return
+        self.dispatch(msg.topic, payload)
+
+
+class MessagePump:
+    """Moves dispatch off paho's network thread.
+
+    The paho callback only decodes and enqueues; a single consumer thread
+    runs the handlers, so game and GUI work never stalls socket I/O or
+    keepalives. Handlers therefore run serially on one thread.
+    """
+
+    def __init__(self, router, maxsize=1024, metrics=REGISTRY):
+        self.router = router
+        self.queue = queue.Queue(maxsize)
+        self.depth = metrics.gauge("pump.depth")
+        self.wait = metrics.histogram("pump.wait")
+        self.dropped = metrics.counter("pump.dropped")
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="message-pump", daemon=True)
+        self.thread.start()
+
+    def on_message(self, client, userdata, msg):
+        payload = decode_payload(msg.payload)
+        if payload is None:
+            self.router.malformed.inc()
+            print(f"Unexpected payload format on {msg.topic}: {msg.payload!r}")
+            return
+        self._put((time.perf_counter(), msg.topic, payload))
+
+    def post(self, func, *args):
+        """Run `func(*args)` on the consumer thread, in order with messages.
+
+        Unlike network messages, posted work is never dropped, so this may
+        block briefly when the queue is full. Don't call it from paho's thread.
+        """
+        self._put((time.perf_counter(), None, (func, args)), block=True)
+
+    def _put(self, item, block=False):
+        try:
+            self.queue.put(item, block)
+        except queue.Full:
+            # Never block the network thread; shed load instead
+            self.dropped.inc()
+            print(f"Message queue full, dropping message on {item[1]}")
+            return
+        self.depth.set(self.queue.qsize())
+
+    def _run(self):
+        while self.running:
+            item = self.queue.get()
+            if item is None:
+                break
+            enqueued, topic, payload = item
+            self.wait.observe(time.perf_counter() - enqueued)
+            self.depth.set(self.queue.qsize())
+            if topic is None:
+                func, args = payload
+                try:
+                    func(*args)
+                except Exception as e:
+                    print(f"Posted task error: {e}")
+            else:
+                self.router.dispatch(topic, payload)
+
+    def stop(self):
+        self.running = False
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self.thread.join(timeout=2)
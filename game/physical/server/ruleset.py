@@ -0,0 +1,65 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Game rules as data. The server loads one RuleSet at start-up, scores with
+# its precomputed tables and pushes it to every remote when it connects, so
+# changing a rule never means reflashing the Picos.
+
+
+class RuleSet:
+    def __init__(self, name, max_health, bet_window, bet_bonus, penalty_cutoff, input_max,
+                 binary_display=False):
+        self.name = name
+        self.max_health = max_health
+        self.bet_window = bet_window
+        self.bet_bonus = bet_bonus
+        self.penalty_cutoff = penalty_cutoff
+        self.input_max = input_max
+        # Remotes show health on the four LEDs instead of the display
+        self.binary_display = binary_display
+
+        # Better health change by distance from the pick, for every distance
+        # up to one past the cut-off (which pays nothing)
+        size = max(input_max, penalty_cutoff) + 2
+        self.bet_table = tuple(self._bet_rule(diff) for diff in range(size))
+        self.bet_array = np.array(self.bet_table, dtype=np.int64) if np is not None else None
+
+    def _bet_rule(self, diff):
+        if diff <= self.bet_window:
+            return self.bet_bonus
+        if diff <= self.penalty_cutoff:
+            return -diff
+        return 0
+
+    def bet_delta(self, picker_num, bet):
+        diff = abs(bet - picker_num)
+        return self.bet_table[min(diff, len(self.bet_table) - 1)]
+
+    def valid_input(self, value):
+        """Whether a pick, guess or bet is inside the remotes' input range."""
+        return 0 <= value <= self.input_max
+
+    def to_message(self):
+        """The "rules" message data sent to remotes."""
+        return {
+            "name": self.name,
+            "max_health": self.max_health,
+            "bet_window": self.bet_window,
+            "bet_bonus": self.bet_bonus,
+            "penalty_cutoff": self.penalty_cutoff,
+            "input_max": self.input_max,
+            "binary_display": self.binary_display,
+        }
+
+
+# Every limited mode bet is inside the window, so every better earns the bonus
+LIMITED = RuleSet("limited", max_health=15, bet_window=15, bet_bonus=2, penalty_cutoff=10,
+                  input_max=15, binary_display=True)
+FULL = RuleSet("full", max_health=100, bet_window=10, bet_bonus=10, penalty_cutoff=70, input_max=100)
+
+RULESETS = {rules.name: rules for rules in (LIMITED, FULL)}
+
+# Rule set the server plays by
+DEFAULT = LIMITED
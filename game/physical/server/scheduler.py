@@ -0,0 +1,168 @@
+import heapq
+import itertools
+import threading
+import time
+
+from metrics import REGISTRY
+
+# Central deadline scheduler.
+#
+# Every timeout in the server (client liveness, phase deadlines, GUI ticks)
+# is an entry in one heap. A single thread sleeps until the earliest
+# deadline, so nothing polls and idle CPU is zero. Adding or cancelling a
+# deadline is O(log n) no matter how many tables and players exist.
+
+
+class Deadline:
+    __slots__ = ("when", "seq", "callback", "args", "interval", "cancelled")
+
+    def __init__(self, when, seq, callback, args, interval=None):
+        self.when = when
+        self.seq = seq
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.when, self.seq) < (other.when, other.seq)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def remaining(self):
+        return max(0.0, self.when - time.monotonic())
+
+
+class DeadlineScheduler:
+    def __init__(self, executor=None, metrics=REGISTRY):
+        """`executor(func, *args)` runs fired callbacks, e.g. MessagePump.post
+        to keep them on the same thread as message handlers. By default they
+        run on the scheduler thread itself."""
+        self.executor = executor
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._cancelled = 0
+        self.running = True
+        self.fired = metrics.counter("scheduler.fired")
+        self.lag = metrics.histogram("scheduler.lag")
+        self.pending = metrics.gauge("scheduler.pending")
+        self.thread = threading.Thread(target=self._run, name="deadline-scheduler", daemon=True)
+        self.thread.start()
+
+    def call_at(self, when, callback, *args):
+        return self._push(Deadline(when, next(self._seq), callback, args))
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    def every(self, interval, callback, *args):
+        """Run `callback` every `interval` seconds until the handle is cancelled."""
+        deadline = Deadline(time.monotonic() + interval, next(self._seq), callback, args, interval)
+        return self._push(deadline)
+
+    def cancel(self, deadline):
+        if deadline is not None and not deadline.cancelled:
+            deadline.cancel()
+            with self._cond:
+                self._cancelled += 1
+                # Cancelled entries are left in the heap; compact when they pile up
+                if self._cancelled > 64 and self._cancelled > len(self._heap) // 2:
+                    self._heap = [d for d in self._heap if not d.cancelled]
+                    heapq.heapify(self._heap)
+                    self._cancelled = 0
+
+    def _push(self, deadline):
+        with self._cond:
+            heapq.heappush(self._heap, deadline)
+            self.pending.set(len(self._heap))
+            # Only wake the thread if this is the new earliest deadline
+            if self._heap[0] is deadline:
+                self._cond.notify()
+        return deadline
+
+    def _run(self):
+        while self.running:
+            with self._cond:
+                while self.running:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    head = self._heap[0]
+                    if head.cancelled:
+                        heapq.heappop(self._heap)
+                        self._cancelled = max(0, self._cancelled - 1)
+                        continue
+                    delay = head.when - time.monotonic()
+                    if delay <= 0:
+                        heapq.heappop(self._heap)
+                        break
+                    self._cond.wait(delay)
+                else:
+                    return
+                if head.interval is not None:
+                    head.when += head.interval
+                    heapq.heappush(self._heap, head)
+                self.pending.set(len(self._heap))
+            self.lag.observe(time.monotonic() - (head.when - (head.interval or 0)))
+            self.fired.inc()
+            self._fire(head)
+
+    def _fire(self, deadline):
+        if self.executor is not None:
+            self.executor(self._call, deadline)
+        else:
+            self._call(deadline)
+
+    @staticmethod
+    def _call(deadline):
+        if deadline.cancelled:
+            return
+        try:
+            deadline.callback(*deadline.args)
+        except Exception as e:
+            print(f"Scheduled callback error: {e}")
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        self.thread.join(timeout=2)
+
+
+class SubmissionSet:
+    """Collects one submission per expected key for a round.
+
+    Only bookkeeping: the engine runs on the message pump and its phase
+    deadlines are DeadlineScheduler entries, so nothing here blocks or
+    keeps time.
+    """
+
+    def __init__(self):
+        self.expected = set()
+        self.values = {}
+
+    def expect(self, keys):
+        """Start a new collection round for `keys`."""
+        self.expected = set(keys)
+        self.values = {}
+
+    def submit(self, key, value):
+        """Record a submission. Returns False if `key` isn't expected or already in."""
+        if key not in self.expected or key in self.values:
+            return False
+        self.values[key] = value
+        return True
+
+    @property
+    def complete(self):
+        return len(self.values) == len(self.expected)
+
+    @property
+    def missing(self):
+        return self.expected - self.values.keys()
+
+    def clear(self):
+        self.expected = set()
+        self.values = {}
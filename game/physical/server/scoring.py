@@ -0,0 +1,90 @@
+from players import PlayerState
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Round scoring, shared by the engine, the simulator and the benchmarks.
+#
+# score_guessers and RuleSet.bet_delta score one round over Player objects
+# and are what a normal table uses. PlayerArrays keeps ids, health, state and bet as NumPy
+# arrays (struct of arrays) so a party-mode table or a simulation with
+# hundreds of betters scores a round in a few vectorized passes. NumPy is
+# optional; without it only the plain path exists.
+
+
+def score_guessers(picker_num, guesser_nums, healths, max_health, forfeit=0):
+    """Return the guessers' new health.
+
+    Both guessers exact heals them to max_health. Otherwise the guesser
+    strictly furthest from the pick loses the difference. A guess of None
+    is a forfeit: that guesser loses `forfeit` and the other is safe.
+    """
+    if None in guesser_nums:
+        return [health - forfeit if n is None else health for health, n in zip(healths, guesser_nums)]
+    diffs = [abs(picker_num - n) for n in guesser_nums]
+    if all(diff == 0 for diff in diffs):
+        return [max_health] * len(healths)
+    worst = max(diffs)
+    if diffs.count(worst) > 1:
+        return list(healths)
+    return [health - diff if diff == worst else health for health, diff in zip(healths, diffs)]
+
+
+def bet_deltas(picker_num, bets, rules):
+    """RuleSet.bet_delta over an array of bets, as one table lookup."""
+    diff = np.minimum(np.abs(bets - picker_num), len(rules.bet_array) - 1)
+    return rules.bet_array[diff]
+
+
+def guesser_deltas(picker_nums, guesses, healths, max_health):
+    """score_guessers for many rounds at once.
+
+    `picker_nums` has shape (games,), `guesses` and `healths` (games, 2).
+    Returns the guessers' new health, shape (games, 2).
+    """
+    diffs = np.abs(guesses - picker_nums[:, None])
+    exact = (diffs == 0).all(axis=1)
+    loses = diffs > diffs[:, ::-1]
+    new = np.where(loses, healths - diffs, healths)
+    new[exact] = max_health
+    return new
+
+
+class PlayerArrays:
+    """Struct-of-arrays player store. Row i of every array is one player."""
+
+    def __init__(self, ids, health):
+        if np is None:
+            raise RuntimeError("PlayerArrays needs NumPy")
+        self.ids = np.asarray(ids, dtype=np.int32)
+        self.health = np.array(health, dtype=np.int32)
+        self.state = np.full(len(self.ids), PlayerState.DEFAULT, dtype=np.int8)
+        self.bet = np.zeros(len(self.ids), dtype=np.int32)
+
+    @classmethod
+    def from_players(cls, players):
+        arrays = cls([p.id for p in players], [p.health for p in players])
+        arrays.state[:] = [p.state for p in players]
+        arrays.bet[:] = [p.bet or 0 for p in players]
+        return arrays
+
+    def __len__(self):
+        return len(self.ids)
+
+    def alive(self):
+        return self.state != PlayerState.DEAD
+
+    def score_round(self, picker_num, guessers, guesser_nums, betters, rules):
+        """Apply one round. `guessers` and `betters` are row indexes (or masks).
+
+        Returns the row indexes of players who died this round.
+        """
+        guessers = np.asarray(guessers)
+        self.health[guessers] = score_guessers(picker_num, guesser_nums, self.health[guessers].tolist(), rules.max_health)
+        self.health[betters] += bet_deltas(picker_num, self.bet[betters], rules)
+
+        died = np.flatnonzero((self.health <= 0) & self.alive())
+        self.state[died] = PlayerState.DEAD
+        return died
@@ -0,0 +1,399 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+import wire
+from broker import Broker
+from metrics import REGISTRY, MetricsRegistry
+from router import TopicRouter, TableRouter, MessagePump
+from scheduler import DeadlineScheduler
+from messages import encode_for
+
+# Which broker GameServer talks to: "embedded" runs the in-process asyncio
+# broker, "mosquitto" launches Mosquitto (Windows only) and "external"
+# connects to one that is already running
+BROKER = "embedded"
+
+# Apply inbound messages on a worker thread instead of paho's network thread
+QUEUED_DISPATCH = True
+
+# Presence comes from retained status messages and last-wills on
+# game/[<table>/]presence/<id>. Ping based timeouts are a fallback for firmware
+# without a last-will; None disables them.
+PING_TIMEOUT = None
+
+# Seconds between latency probes: a ping to every client, which firmware
+# echoes back, and a message the server sends itself through the broker.
+# They feed the client.<id>.rtt and broker.rtt histograms. Probes cost two
+# messages per client, so they only run between start_probes() and
+# stop_probes(), i.e. while the performance panel is shown.
+PROBE_INTERVAL = 5
+PROBE_TOPIC = wire.topic(None, "server", "probe")
+
+
+class Table:
+    """One game table: its state, routes, codecs and topics.
+
+    Tables are cheap. Any number share a GameServer's MQTT connection,
+    message pump and scheduler, so hosting more of them adds no threads.
+    `game` is the object owning the table's engine (with .engine and
+    .refresh()), e.g. main.Game or headless.HeadlessGame.
+    """
+
+    def __init__(self, server, name, game, gamestate, metrics=None):
+        self.server = server
+        self.name = name
+        self.game = game
+        self.state = gamestate
+        # The unscoped table keeps the process-wide registry
+        self.metrics = metrics or (REGISTRY if name is None else MetricsRegistry())
+
+        self.codecs = {}  # client id -> negotiated wire codec
+        self.last_pings = {}
+        self.liveness = {}  # client id -> pending liveness Deadline
+        self.rtt = {}  # client id -> last probe round trip in seconds
+        self.sent = self.metrics.counter("table.sent")
+        self.sent_to = {}  # client id -> its client.<id>.sent counter
+
+        self.router = TopicRouter(self.metrics)
+        self.setup_routes()
+
+    def topic(self, *parts):
+        return wire.topic(self.name, *parts)
+
+    def setup_routes(self):
+        r = self.router
+        # Presence: retained online status and last-will offline per client,
+        # plus legacy connect/ping messages on the server channel
+        r.listen(self.topic("presence", "+"))
+        r.listen(self.topic("server"))
+        r.add("connect", self.handle_connect)
+        r.add("disconnect", self.handle_disconnect)
+        r.add("ping", self.handle_ping)
+        # Game channels
+        r.add("light_wheel", self.handle_wheel_response, topic=self.topic("wheel", "response"))
+        r.add("pick", self.handle_pick, topic=self.topic("picker", "response"))
+        r.add("guess", self.handle_guess, topic=self.topic("guesser", "response"))
+        r.add("bet", self.handle_bet, topic=self.topic("better", "response"))
+        r.add("start", self.handle_console_start, topic=self.topic("console"))
+
+    def handle_connect(self, client_id, data, payload):
+        codec = payload.get("codec", wire.JSON)
+        self.codecs[client_id] = codec if codec in wire.CODECS else wire.JSON
+        print(f"Client {client_id} connected ({self.codecs[client_id]})")
+        self.state.clients[client_id] = True
+        if client_id != 0:
+            # Remotes take health, input range and display mode from the server
+            self.send_message(client_id, "rules", self.state.rules.to_message())
+        self.handle_ping(client_id, data, payload)
+        if client_id == 0:
+            self.state.console_connected = True
+        self.game.engine.on_join(client_id)
+        self.game.refresh()
+
+    def handle_disconnect(self, client_id, data, payload):
+        if client_id not in self.state.clients:
+            return  # e.g. a retained offline status from an earlier session
+        print(f"Client {client_id} disconnected")
+        self.drop_client(client_id)
+
+    def drop_client(self, client_id):
+        self.last_pings.pop(client_id, None)
+        self.router.last_seen.pop(client_id, None)
+        self.rtt.pop(client_id, None)
+        self.server.scheduler.cancel(self.liveness.pop(client_id, None))
+        self.state.clients.pop(client_id, None)
+        # Update console status
+        if client_id == 0:
+            self.state.console_connected = False
+        self.game.engine.on_leave(client_id)
+        self.game.refresh()
+
+    def handle_ping(self, client_id, data, payload):
+        self.last_pings[client_id] = time.monotonic()
+        if data is not None:
+            self.record_rtt(client_id, data)
+        # One liveness deadline per client; pings only move the timestamp and
+        # the deadline re-arms itself when it fires early
+        if PING_TIMEOUT is not None and client_id != 0 and client_id not in self.liveness:
+            self.liveness[client_id] = self.server.scheduler.call_later(PING_TIMEOUT, self.check_liveness, client_id)
+
+    def probe_clients(self):
+        # Millisecond stamp, wrapped to fit the binary ping's u16
+        stamp = int(time.monotonic() * 1000) & 0xFFFF
+        for client_id in list(self.state.clients):
+            self.send_message(client_id, "ping", stamp)
+
+    def record_rtt(self, client_id, stamp):
+        """A client echoed a probe_clients() stamp."""
+        rtt = ((int(time.monotonic() * 1000) - int(stamp)) & 0xFFFF) / 1000
+        self.rtt[client_id] = rtt
+        self.metrics.histogram(f"client.{client_id}.rtt").observe(rtt)
+
+    def handle_wheel_response(self, client_id, data, payload):
+        # No phase waits for "done", but role reveals do
+        if data == "done":
+            self.game.engine.on_wheel_done()
+
+    def handle_pick(self, client_id, data, payload):
+        if self.state.rules.valid_input(int(data)):
+            self.game.engine.on_pick(client_id, int(data))
+
+    def handle_guess(self, client_id, data, payload):
+        index = int(payload.get('index'))
+        if self.state.rules.valid_input(int(data)):
+            self.game.engine.on_guess(client_id, index, int(data))
+
+    def handle_bet(self, client_id, data, payload):
+        if self.state.rules.valid_input(int(data)):
+            self.game.engine.on_bet(client_id, int(data))
+
+    def handle_console_start(self, client_id, data, payload):
+        self.game.engine.start()
+
+    def check_liveness(self, client_id):
+        self.liveness.pop(client_id, None)
+        if client_id not in self.state.clients:
+            return
+        remaining = self.last_pings.get(client_id, 0) + PING_TIMEOUT - time.monotonic()
+        if remaining > 0:
+            self.liveness[client_id] = self.server.scheduler.call_later(remaining, self.check_liveness, client_id)
+            return
+        print(f"Client {client_id} timed out")
+        self.drop_client(client_id)
+
+    def post(self, func, *args):
+        self.server.post(func, *args)
+
+    def send_message(self, client_id, msg_type, data=None, **extra):
+        """Send a message built from native values, serialized exactly once
+        in the codec the client negotiated."""
+        codec = self.codecs.get(client_id, wire.JSON)
+        self.server.client.publish(self.topic("client", client_id), encode_for(codec, msg_type, data, **extra), qos=1)
+        self.sent.inc()
+        self.count_sent(client_id)
+
+    def send_encoded(self, client_id, prepared):
+        """Send a pre-encoded message, e.g. one of the constants in messages."""
+        encoded = prepared[self.codecs.get(client_id, wire.JSON)]
+        self.server.client.publish(self.topic("client", client_id), encoded, qos=1)
+        self.sent.inc()
+        self.count_sent(client_id)
+
+    def count_sent(self, client_id):
+        counter = self.sent_to.get(client_id)
+        if counter is None:
+            counter = self.sent_to[client_id] = self.metrics.counter(f"client.{client_id}.sent")
+        counter.inc()
+
+    def broadcast_message(self, msg_type, data=None, **extra):
+        # Broadcasts stay JSON since every client can decode it
+        self.server.client.publish(self.topic("broadcast"), encode_for(wire.JSON, msg_type, data, **extra), qos=1)
+        self.sent.inc()
+
+
+class GameServer:
+    """The MQTT side of the server: broker, client connection, message pump
+    and scheduler, shared by every Table hosted in this process."""
+
+    def __init__(self, bind_address="192.168.137.1", port=1883, broker=BROKER):
+        print("Starting Game Server...")
+        self.broker = None
+        if broker == "embedded":
+            self.start_embedded_broker(bind_address, port)
+        elif broker == "mosquitto":
+            self.start_broker()
+
+        self.tables = {}  # table name (None for the unscoped table) -> Table
+        self.router = TableRouter()
+        self.pump = MessagePump(self.router) if QUEUED_DISPATCH else None
+
+        self.client = mqtt.Client()
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.pump.on_message if self.pump else self.router.on_message
+        # Probes come straight back to the network thread, skipping the pump
+        self.client.message_callback_add(PROBE_TOPIC, self.on_probe)
+        self.broker_rtt = REGISTRY.histogram("broker.rtt")
+        self.connected = False
+
+        self.bind_address = bind_address
+        self.port = port
+
+        # Timers fire on the message pump so they never race the handlers
+        self.scheduler = DeadlineScheduler(executor=self.pump.post if self.pump else None)
+        self.probes = None  # repeating send_probes Deadline while probing
+
+    def add_table(self, name, game, gamestate, metrics=None):
+        """Host a table. `name` None uses the single-table game/... topics."""
+        if name is not None:
+            name = str(name)
+            if name in wire.CHANNELS or "/" in name or "+" in name or "#" in name:
+                raise ValueError(f"Invalid table name {name!r}")
+        if name in self.tables:
+            raise ValueError(f"Table {name!r} already exists")
+        table = Table(self, name, game, gamestate, metrics)
+        self.tables[name] = table
+        self.router.add(name, table.router)
+        if self.connected:
+            table.router.subscribe(self.client)
+        return table
+
+    def remove_table(self, name):
+        table = self.tables.pop(name, None)
+        if table is None:
+            return None
+        self.router.remove(name)
+        if self.connected:
+            for topic in table.router.topics:
+                self.client.unsubscribe(topic)
+        for deadline in table.liveness.values():
+            self.scheduler.cancel(deadline)
+        return table
+
+    def connect(self):
+        """Connect to the broker. Call once the engine and GUI exist, since
+        retained presence messages start arriving straight away."""
+        max_retries = 5
+        retry_delay = 0.5
+
+        for attempt in range(max_retries):
+            try:
+                self.client.connect(self.bind_address, self.port, 60)
+                self.client.loop_start()
+                print(f"MQTT connected on attempt {attempt + 1}")
+                break
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    print(f"Connection attempt {attempt + 1} failed, retrying in {retry_delay}s...")
+                    time.sleep(retry_delay)
+                else:
+                    print(f"Failed to start MQTT client after {max_retries} attempts: {e}")
+                    sys.exit(1)
+
+    def start_embedded_broker(self, bind_address, port=1883):
+        print("Starting embedded MQTT broker...")
+        self.broker = Broker(bind_address, port)
+        # Blocks until the listening socket is bound, no fixed sleep needed
+        self.broker.start()
+
+    def start_broker(self):
+        try:
+            print("Starting Mosquitto MQTT broker...")
+            # Check if port is in use
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            in_use = sock.connect_ex(('192.168.137.1', 1883)) == 0
+            sock.close()
+            
+            if in_use:
+                print("Port 1883 is in use, killing existing broker...")
+                # Kill any existing mosquitto process
+                subprocess.run(["taskkill", "/f", "/im", "mosquitto.exe"], 
+                            capture_output=True)
+                # Force close port on Windows
+                subprocess.run(["netsh", "int", "ipv4", "delete", "excludedportrange", 
+                            "protocol=tcp", "startport=1883", "numberofports=1"],
+                            capture_output=True)
+                time.sleep(3)  # Wait for cleanup
+                
+            # Create config file    
+            config_content = """
+    listener 1883
+    allow_anonymous true
+    persistence false
+    bind_address 192.168.137.1
+            """
+            config_path = "mosquitto.conf"
+            with open(config_path, "w") as f:
+                f.write(config_content)
+            
+            # Start broker in new window
+            broker_cmd = f'''
+            Start-Process powershell -ArgumentList "-NoExit", "-Command", `
+            "& 'C:\\Program Files\\mosquitto\\mosquitto.exe' -c {os.path.abspath(config_path)} -v"
+            '''
+            
+            subprocess.run(["powershell", "-Command", broker_cmd])
+            time.sleep(2)  # Wait for startup
+            print("Mosquitto MQTT broker started")
+            
+        except Exception as e:
+            print(f"Error starting broker: {e}")
+            raise
+
+    def on_connect(self, client, userdata, flags, rc):
+        print("Connected to MQTT broker")
+        self.connected = True
+        self.router.subscribe(self.client)
+        self.client.subscribe(PROBE_TOPIC, 0)
+        print(f"Subscribed to {len(self.router.topics)} channels for {len(self.tables)} table(s)")
+
+    def start_probes(self, interval=PROBE_INTERVAL):
+        if self.probes is None:
+            self.probes = self.scheduler.every(interval, self.send_probes)
+
+    def stop_probes(self):
+        self.scheduler.cancel(self.probes)
+        self.probes = None
+
+    def send_probes(self):
+        if not self.connected:
+            return
+        self.client.publish(PROBE_TOPIC, repr(time.monotonic()), qos=0)
+        for table in list(self.tables.values()):
+            table.probe_clients()
+
+    def on_probe(self, client, userdata, msg):
+        try:
+            self.broker_rtt.observe(time.monotonic() - float(msg.payload))
+        except ValueError:
+            pass
+
+    def post(self, func, *args):
+        """Run `func` on the thread that applies messages (the game thread)."""
+        if self.pump:
+            self.pump.post(func, *args)
+        else:
+            func(*args)
+
+    def call(self, func, *args):
+        """Run `func(*args)` on the game thread, wait and return its result.
+        Must not be called from the game thread itself."""
+        done = threading.Event()
+        result = []
+        error = []
+
+        def run():
+            try:
+                result.append(func(*args))
+            except Exception as e:
+                error.append(e)
+            finally:
+                done.set()
+
+        self.post(run)
+        done.wait()
+        if error:
+            raise error[0]
+        return result[0] if result else None
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+        self.scheduler.stop()
+        if self.pump:
+            self.pump.stop()
+        if self.broker:
+            self.broker.stop()
+            self.broker = None
+
+    def __del__(self):
+        self.scheduler.stop()
+        if self.pump:
+            self.pump.stop()
+        if self.broker:
+            self.broker.stop()
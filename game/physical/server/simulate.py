@@ -0,0 +1,196 @@
+import argparse
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from ruleset import RULESETS
+from scoring import bet_deltas, guesser_deltas
+
+# Monte Carlo simulator for tuning the rule constants.
+#
+# Plays many games at once as (games, players) arrays: each round picks
+# roles the way GameEngine.select_roles does (a uniformly random alive
+# picker, two random guessers, everyone else alive bets), scores it with
+# the same functions as the server and retires games that meet the win
+# conditions. Batches are spread over a multiprocessing pool and only
+# histograms come back, so millions of games take seconds.
+#
+#   python simulate.py --games 1000000 --players 8 --rules limited full
+
+# Bot strategies: strategy(rng, shape, input_max) -> int array of inputs
+
+def uniform(rng, shape, input_max):
+    return rng.integers(0, input_max + 1, shape)
+
+
+def middle(rng, shape, input_max):
+    # Hedge towards the centre of the encoder range
+    spread = max(1, input_max // 6)
+    return np.clip(np.rint(rng.normal(input_max / 2, spread, shape)), 0, input_max).astype(np.int64)
+
+
+def edges(rng, shape, input_max):
+    return np.where(rng.random(shape) < 0.5, 0, input_max)
+
+
+def lazy(rng, shape, input_max):
+    # Leaves the encoder where it started
+    return np.zeros(shape, dtype=np.int64)
+
+
+STRATEGIES = {
+    "uniform": uniform,
+    "middle": middle,
+    "edges": edges,
+    "lazy": lazy,
+}
+
+
+def select_roles(alive, rng):
+    """Roles for every game: picker index, guesser indexes (games, 2) and a
+    better mask. Sorting random keys with the dead pushed last is a uniform
+    draw over the alive players, as in GameEngine.select_roles."""
+    keys = rng.random(alive.shape)
+    keys[~alive] = 2.0
+    order = np.argsort(keys, axis=1)
+    picker = order[:, 0]
+    guessers = order[:, 1:3]
+    betters = alive.copy()
+    rows = np.arange(len(alive))
+    betters[rows, picker] = False
+    betters[rows[:, None], guessers] = False
+    return picker, guessers, betters
+
+
+def play_batch(args):
+    """Play `games` games and return histograms of length, survivors and the
+    winner's health. Runs in a pool worker."""
+    seed, games, players, max_rounds, rules, strategies = args
+    rules = RULESETS[rules]
+    picker_bot, guesser_bot, better_bot = (STRATEGIES[name] for name in strategies)
+    input_max = rules.input_max
+    rng = np.random.default_rng(seed)
+
+    health = np.full((games, players), rules.max_health, dtype=np.int64)
+    alive = np.ones((games, players), dtype=bool)
+    rounds = np.zeros(games, dtype=np.int64)
+    first_death = np.zeros(games, dtype=np.int64)
+    active = np.ones(games, dtype=bool)
+    rows = np.arange(games)
+
+    while True:
+        # Win conditions, checked before each round as the engine does
+        active &= (alive.sum(axis=1) >= 3) & (rounds < max_rounds)
+        if not active.any():
+            break
+        idx = rows[active]
+        h, a = health[idx], alive[idx]
+        sub = np.arange(len(idx))
+
+        picker, guessers, betters = select_roles(a, rng)
+        pick = picker_bot(rng, len(idx), input_max)
+        guesses = guesser_bot(rng, (len(idx), 2), input_max)
+        bets = better_bot(rng, a.shape, input_max)
+
+        h[sub[:, None], guessers] = guesser_deltas(pick, guesses, h[sub[:, None], guessers], rules.max_health)
+        deltas = bet_deltas(pick[:, None], bets, rules)
+        h += np.where(betters, deltas, 0)
+
+        died = a & (h <= 0)
+        a &= ~died
+        rounds[idx] += 1
+        newly = died.any(axis=1) & (first_death[idx] == 0)
+        first_death[idx[newly]] = rounds[idx[newly]]
+        health[idx], alive[idx] = h, a
+
+    survivors = alive.sum(axis=1)
+    winner = np.where(alive, health, np.iinfo(np.int64).min).max(axis=1)
+    winner = np.where(survivors > 0, winner, 0)
+    top = max(rules.max_health * 4, int(winner.max()) + 1)
+    return (
+        np.bincount(rounds, minlength=max_rounds + 1),
+        np.bincount(survivors, minlength=players + 1),
+        np.bincount(first_death, minlength=max_rounds + 1),
+        np.bincount(np.clip(winner, 0, None), minlength=top),
+    )
+
+
+def _merge(total, part):
+    if total is None:
+        return list(part)
+    out = []
+    for a, b in zip(total, part):
+        size = max(len(a), len(b))
+        out.append(np.pad(a, (0, size - len(a))) + np.pad(b, (0, size - len(b))))
+    return out
+
+
+def simulate(games, players, max_rounds, rules="limited", strategies=("uniform", "uniform", "uniform"),
+             batch=20000, workers=None, seed=0):
+    """Play `games` games over a process pool. Returns the merged histograms
+    (rounds played, survivors, round of first death, winner health)."""
+    jobs = []
+    remaining = games
+    while remaining > 0:
+        size = min(batch, remaining)
+        jobs.append((seed + len(jobs), size, players, max_rounds, rules, tuple(strategies)))
+        remaining -= size
+
+    total = None
+    with multiprocessing.Pool(workers) as pool:
+        for part in pool.imap_unordered(play_batch, jobs):
+            total = _merge(total, part)
+    return total
+
+
+def _quantile(hist, q):
+    cumulative = np.cumsum(hist)
+    return int(np.searchsorted(cumulative, q * cumulative[-1]))
+
+
+def _mean(hist):
+    return float((np.arange(len(hist)) * hist).sum() / hist.sum())
+
+
+def report(name, hists, players):
+    rounds, survivors, first_death, winner = hists
+    games = rounds.sum()
+    print(f"{name}: {games} games")
+    print(f"  rounds played   mean {_mean(rounds):6.2f}  p50 {_quantile(rounds, 0.5):3}  "
+          f"p90 {_quantile(rounds, 0.9):3}  max {len(np.trim_zeros(rounds, 'b')) - 1:3}")
+    no_death = first_death[0] / games
+    deaths = first_death[1:]
+    first = f"mean round {(np.arange(1, len(first_death)) * deaths).sum() / deaths.sum():5.2f}" if deaths.sum() else "never"
+    print(f"  first death     {first}  (no deaths in {no_death:.1%} of games)")
+    print(f"  survivors       mean {_mean(survivors):5.2f} of {players}  "
+          + "  ".join(f"{n}:{count / games:.1%}" for n, count in enumerate(survivors) if count))
+    print(f"  winner health   mean {_mean(winner):6.2f}  p50 {_quantile(winner, 0.5):3}  p90 {_quantile(winner, 0.9):3}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo simulation of Guess Roulette rule sets")
+    parser.add_argument("--games", type=int, default=1000000)
+    parser.add_argument("--players", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=10, help="max rounds per game")
+    parser.add_argument("--rules", nargs="+", choices=sorted(RULESETS), default=["limited", "full"])
+    parser.add_argument("--picker", choices=sorted(STRATEGIES), default="uniform")
+    parser.add_argument("--guesser", choices=sorted(STRATEGIES), default="uniform")
+    parser.add_argument("--better", choices=sorted(STRATEGIES), default="uniform")
+    parser.add_argument("--batch", type=int, default=20000, help="games per worker task")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    strategies = (args.picker, args.guesser, args.better)
+    for rules in args.rules:
+        started = time.perf_counter()
+        hists = simulate(args.games, args.players, args.rounds, rules, strategies,
+                         args.batch, args.workers, args.seed)
+        elapsed = time.perf_counter() - started
+        report(f"{rules} ({'/'.join(strategies)}, {elapsed:.1f}s)", hists, args.players)
+
+
+if __name__ == "__main__":
+    main()
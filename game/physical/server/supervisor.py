@@ -0,0 +1,251 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+
+# Codec shared with the Pico firmware
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+
+from broker import Broker
+from engine import Phase
+from headless import HeadlessGame
+from server import GameServer
+
+# Process-per-table scaling.
+#
+# One process hosts any number of tables, but they all share its GIL, so
+# decoding, scoring and encoding for every table runs on one core. The
+# Supervisor runs the broker and a pool of worker processes, each with its
+# own GameServer (connection, pump and scheduler) hosting a share of the
+# tables. A worker subscribes only to game/<table>/... for its own tables,
+# so the broker routes each table's traffic to the process that owns it.
+#
+# The supervisor talks to workers over a pipe: create, remove and migrate
+# tables, start games and collect a combined status. Migration moves a table
+# between games or rounds: the old worker snapshots and drops it, the new
+# one subscribes, and the players' retained presence brings them back with
+# their health.
+#
+#   python supervisor.py --workers 4 --tables 32
+
+
+def _add(server, games, checkpoint_dir, name, rounds, snapshot=None):
+    # Runs on the pump, so retained presence for the new subscriptions is
+    # queued behind the restore
+    games[name] = HeadlessGame(rounds=rounds, table=name, server=server,
+                               checkpoint_dir=checkpoint_dir, snapshot=snapshot)
+
+
+def _remove(server, games, name, discard=False):
+    game = games[name]
+    if not discard and game.engine.phase not in (Phase.LOBBY, Phase.GAME_OVER):
+        raise ValueError(f"Can't move a table mid-round ({game.engine.phase})")
+    snapshot = game.engine.snapshot()
+    del games[name]
+    game.close()
+    if discard and game.checkpoint is not None:
+        game.checkpoint.clear()
+    return snapshot
+
+
+def worker_main(conn, bind_address, port, checkpoint_dir=None):
+    """Worker process: one GameServer hosting the tables the supervisor
+    assigns it. Commands arrive over `conn` as (command, args)."""
+    server = GameServer(bind_address, port, broker="external")
+    server.connect()
+    games = {}
+    while True:
+        try:
+            command, args = conn.recv()
+        except EOFError:
+            break
+        if command == "stop":
+            break
+        try:
+            if command == "add":
+                result = server.call(_add, server, games, checkpoint_dir, *args)
+            elif command == "remove":
+                result = server.call(_remove, server, games, *args)
+            elif command == "start":
+                name, rounds = args
+                result = games[name].start_game(rounds)
+            elif command == "status":
+                result = dict((name, game.status()) for name, game in games.items())
+            else:
+                raise ValueError(f"Unknown command {command!r}")
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+            continue
+        conn.send((True, result))
+    for game in list(games.values()):
+        game.close()
+    server.close()
+
+
+class Worker:
+    """The supervisor's handle on one worker process."""
+
+    def __init__(self, index, bind_address, port, checkpoint_dir=None):
+        self.index = index
+        self.tables = set()
+        self.lock = threading.Lock()
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=worker_main,
+                                               args=(child, bind_address, port, checkpoint_dir),
+                                               name=f"table-worker-{index}", daemon=True)
+        self.process.start()
+        child.close()
+
+    def request(self, command, *args):
+        with self.lock:
+            self.conn.send((command, args))
+            ok, result = self.conn.recv()
+        if not ok:
+            raise RuntimeError(f"Worker {self.index}: {result}")
+        return result
+
+    def stop(self, timeout=5):
+        try:
+            with self.lock:
+                self.conn.send(("stop", ()))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class Supervisor:
+    """Broker plus a pool of worker processes, with tables spread across them.
+
+    With `checkpoint_dir` every table checkpoints there, and a table created
+    under the name of one that was running when the host died resumes its
+    game.
+    """
+
+    def __init__(self, bind_address="127.0.0.1", port=1883, broker="embedded", workers=None,
+                 checkpoint_dir=None):
+        self.broker = None
+        if broker == "embedded":
+            self.broker = Broker(bind_address, port)
+            self.broker.start()
+        self.workers = [Worker(i, bind_address, port, checkpoint_dir)
+                        for i in range(workers or os.cpu_count())]
+        self.tables = {}  # table name -> Worker
+        self.lock = threading.Lock()
+
+    def _least_loaded(self):
+        return min(self.workers, key=lambda worker: len(worker.tables))
+
+    def create_table(self, name=None, rounds=1, worker=None):
+        """Host a new table, on the least loaded worker unless one is given.
+        Returns the table name."""
+        with self.lock:
+            if name is None:
+                name = str(next(n for n in range(1, len(self.tables) + 2) if str(n) not in self.tables))
+            name = str(name)
+            if name in self.tables:
+                raise ValueError(f"Table {name!r} already exists")
+            target = self.workers[worker] if worker is not None else self._least_loaded()
+            target.request("add", name, rounds)
+            target.tables.add(name)
+            self.tables[name] = target
+        print(f"Table {name} on worker {target.index}")
+        return name
+
+    def remove_table(self, name):
+        with self.lock:
+            worker = self.tables.pop(name)
+            worker.tables.discard(name)
+            return worker.request("remove", name, True)
+
+    def migrate(self, name, worker):
+        """Move a table to worker index `worker`. Fails mid-round."""
+        with self.lock:
+            source = self.tables[name]
+            target = self.workers[worker]
+            if source is target:
+                return
+            snapshot = source.request("remove", name)
+            source.tables.discard(name)
+            target.request("add", name, snapshot["max_rounds"], snapshot)
+            target.tables.add(name)
+            self.tables[name] = target
+        print(f"Table {name} moved from worker {source.index} to {target.index}")
+
+    def start(self, name=None, rounds=None):
+        """Start a game on one table, or on every table."""
+        names = [name] if name is not None else list(self.tables)
+        for table in names:
+            self.tables[table].request("start", table, rounds)
+
+    def status(self):
+        """Status of every table, keyed by name, with the worker hosting it."""
+        combined = {}
+        for worker in self.workers:
+            for name, status in worker.request("status").items():
+                status["worker"] = worker.index
+                status["pid"] = worker.process.pid
+                combined[name] = status
+        return combined
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+        if self.broker:
+            self.broker.stop()
+            self.broker = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Guess Roulette tables across worker processes")
+    parser.add_argument("--bind", default="0.0.0.0", help="broker address to listen on or connect to")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--broker", choices=("embedded", "external"), default="embedded",
+                        help="run the in-process broker or connect to a running one")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--tables", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--checkpoint-dir", help="checkpoint tables here and resume their games on start")
+    args = parser.parse_args()
+
+    supervisor = Supervisor(args.bind, args.port, args.broker, args.workers, args.checkpoint_dir)
+    for _ in range(args.tables):
+        supervisor.create_table(rounds=args.rounds)
+    print("Commands: start [table] [rounds], status, add [table], remove <table>, migrate <table> <worker>, quit")
+    try:
+        while True:
+            try:
+                line = input().split()
+            except EOFError:
+                break
+            if not line:
+                continue
+            try:
+                if line[0] == "start":
+                    supervisor.start(line[1] if len(line) > 1 else None,
+                                     int(line[2]) if len(line) > 2 else None)
+                elif line[0] == "status":
+                    for name, status in sorted(supervisor.status().items()):
+                        print(name, status)
+                elif line[0] == "add":
+                    supervisor.create_table(line[1] if len(line) > 1 else None, args.rounds)
+                elif line[0] == "remove":
+                    supervisor.remove_table(line[1])
+                elif line[0] == "migrate":
+                    supervisor.migrate(line[1], int(line[2]))
+                elif line[0] == "quit":
+                    break
+                else:
+                    print(f"Unknown command: {line[0]}")
+            except (KeyError, IndexError, ValueError, RuntimeError) as e:
+                print(f"Error: {e!r}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        supervisor.close()
+
+
+if __name__ == "__main__":
+    main()
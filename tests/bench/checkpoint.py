@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+import timeit
+
+# Checkpoint size and cost: encoding a mid-round snapshot, saving it
+# atomically with and without fsync, and loading it back, at 8, 100 and
+# 1,000 players.
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "game", "physical", "server"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "game", "physical", "common"))
+
+import checkpoint
+from engine import Phase
+from metrics import MetricsRegistry
+from players import PlayerState
+
+SIZES = (8, 100, 1000)
+
+
+def make_snapshot(count):
+    players = [(1, 15, PlayerState.PICKER, None, 7, False, 0),
+               (2, 12, PlayerState.GUESSER, None, 3, False, 1),
+               (3, 9, PlayerState.GUESSER, None, None, True, 2)]
+    players += [(i, 15 - i % 7, PlayerState.BETTER, i % 16, i % 16, False, i - 3) for i in range(4, count + 1)]
+    return {
+        "rules": "limited",
+        "max_rounds": 10,
+        "round": 4,
+        "started": True,
+        "accepting_players": False,
+        "phase": Phase.GUESSING,
+        "picker_num": 7,
+        "players": players,
+    }
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    print(f"{'players':>8} {'bytes':>7} {'encode us':>10} {'save us':>9} {'fsync us':>9} {'load us':>8}")
+    for size in SIZES:
+        snapshot = make_snapshot(size)
+        path = os.path.join(directory, f"{size}.bin")
+        fast = checkpoint.Checkpoint(path, fsync=False, metrics=MetricsRegistry())
+        safe = checkpoint.Checkpoint(path, fsync=True, metrics=MetricsRegistry())
+        assert checkpoint.decode(checkpoint.encode(snapshot)) == snapshot
+
+        results = []
+        for func, number in (
+            (lambda: checkpoint.encode(snapshot), 2000),
+            (lambda: fast.save(snapshot), 200),
+            (lambda: safe.save(snapshot), 20),
+            (fast.load, 2000),
+        ):
+            results.append(min(timeit.repeat(func, number=number, repeat=5)) / number)
+        encode, save, synced, load = results
+        print(f"{size:>8} {len(checkpoint.encode(snapshot)):>7} {encode * 1e6:>10.1f} {save * 1e6:>9.1f} "
+              f"{synced * 1e6:>9.1f} {load * 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import os
+import random
+import sys
+import timeit
+
+# Round scoring cost: the per-Player loop the engine uses, NumPy over Player
+# objects (copying in and out of arrays each round) and the struct-of-arrays
+# PlayerArrays store, at 10, 100 and 10,000 players.
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "game", "physical", "server"))
+
+import numpy as np
+
+from players import Player, PlayerState
+from ruleset import LIMITED as RULES
+from scoring import PlayerArrays, bet_deltas, score_guessers
+
+SIZES = (10, 100, 10000)
+MAX_HEALTH = RULES.max_health
+
+
+def make_players(count):
+    rng = random.Random(count)
+    players = [Player(i + 1, MAX_HEALTH) for i in range(count)]
+    for player in players:
+        player.bet = rng.randint(0, 15)
+    for player in players[:2]:
+        player.state = PlayerState.GUESSER
+    for player in players[2:]:
+        player.state = PlayerState.BETTER
+    return players[:2], players[2:]
+
+
+def loop_round(guessers, betters, picker_num, guesser_nums):
+    healths = score_guessers(picker_num, guesser_nums, [g.health for g in guessers], MAX_HEALTH)
+    for guesser, health in zip(guessers, healths):
+        guesser.health = health
+    for better in betters:
+        better.health += RULES.bet_delta(picker_num, better.bet)
+    return [p for p in guessers + betters if p.health <= 0]
+
+
+def objects_numpy_round(guessers, betters, picker_num, guesser_nums):
+    healths = score_guessers(picker_num, guesser_nums, [g.health for g in guessers], MAX_HEALTH)
+    for guesser, health in zip(guessers, healths):
+        guesser.health = health
+    bets = np.fromiter((b.bet for b in betters), dtype=np.int32, count=len(betters))
+    deltas = bet_deltas(picker_num, bets, RULES).tolist()
+    for better, delta in zip(betters, deltas):
+        better.health += delta
+    return [p for p in guessers + betters if p.health <= 0]
+
+
+def check():
+    # Forfeits (None): both idle guessers lose, a lone one loses alone
+    assert score_guessers(7, [None, None], [10, 10], MAX_HEALTH, 8) == [2, 2]
+    assert score_guessers(7, [None, 9], [10, 10], MAX_HEALTH, 8) == [2, 10]
+    assert score_guessers(7, [5, 9], [10, 10], MAX_HEALTH) == [10, 10]
+    assert score_guessers(7, [7, 7], [10, 10], MAX_HEALTH) == [MAX_HEALTH, MAX_HEALTH]
+
+
+def main():
+    check()
+    print(f"{'players':>8} {'loop us':>10} {'numpy/obj us':>13} {'arrays us':>10} {'loop/arrays':>12}")
+    for size in SIZES:
+        number = max(10, 200000 // size)
+        guessers, betters = make_players(size)
+        arrays = PlayerArrays.from_players(guessers + betters)
+        guesser_rows = np.arange(2)
+        better_rows = np.arange(2, size)
+
+        # Keep health from running away between repeats
+        def reset():
+            for player in guessers + betters:
+                player.health = MAX_HEALTH
+            arrays.health[:] = MAX_HEALTH
+            arrays.state[:] = PlayerState.BETTER
+
+        results = []
+        for func in (
+            lambda: loop_round(guessers, betters, 7, [5, 9]),
+            lambda: objects_numpy_round(guessers, betters, 7, [5, 9]),
+            lambda: arrays.score_round(7, guesser_rows, [5, 9], better_rows, RULES),
+        ):
+            best = min(timeit.repeat(func, setup=reset, number=number, repeat=5)) / number
+            results.append(best)
+        loop, objects, soa = results
+        print(f"{size:>8} {loop * 1e6:>10.1f} {objects * 1e6:>13.1f} {soa * 1e6:>10.1f} {loop / soa:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import itertools
+import json
+import os
+import sys
+import timeit
+
+# Per-message cost of Table.send_message, the real send path (encode_for
+# plus publish), against the old send path (dumps -> loads -> dumps) it
+# replaced, for the end-of-round health fan-out to 12 players.
+#
+# messages caches small repeated payloads, so each codec is timed twice:
+# "repeated" sends the same few health values every round like a real table,
+# "varied" cycles through more distinct values than the cache holds so every
+# message is encoded from scratch. "wheel" sends light_wheel id lists, which
+# can't be cached at all.
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "game", "physical", "server"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "game", "physical", "common"))
+
+import wire
+from engine import GameState
+from server import GameServer
+
+PLAYERS = 12
+ROUNDS = 5000
+# More distinct values than messages' lru_cache(maxsize=512) keeps
+VARIED = 4096
+
+
+class FakeClient:
+    def __init__(self):
+        self.sent = 0
+
+    def publish(self, topic, payload, qos=0):
+        self.sent += 1
+
+
+client = FakeClient()
+
+
+def legacy_send(client_id, message):
+    # The pre-send_message GameServer.send, kept here for comparison
+    msg_json = json.loads(message)
+    payload = {
+        "type": msg_json.get("type", "unknown"),
+        "data": msg_json.get("data", None),
+    }
+    if "health" in msg_json:
+        payload["health"] = msg_json["health"]
+    client.publish(f"game/client/{client_id}", json.dumps(payload), qos=1)
+
+
+def make_table(codec):
+    server = GameServer("127.0.0.1", 1883, broker="external")
+    table = server.add_table(None, None, GameState())
+    for player_id in range(PLAYERS + 1):
+        table.codecs[player_id] = codec
+    real, server.client = server.client, client
+    return server, real, table
+
+
+def main():
+    repeated = [15 - (i % 5) for i in range(PLAYERS)]
+    varied = itertools.cycle(range(VARIED))
+    wheels = itertools.cycle([[a, b] for a in range(1, 11) for b in range(1, 11) if a != b])
+    ids = range(1, PLAYERS + 1)
+
+    def legacy_fanout():
+        for player_id in ids:
+            legacy_send(player_id, json.dumps({"type": "health", "health": next(varied)}))
+
+    print(f"{'path':>10} {'payloads':>9} {'us/message':>11}")
+    best = min(timeit.repeat(legacy_fanout, number=ROUNDS, repeat=5)) / (ROUNDS * PLAYERS)
+    print(f"{'legacy':>10} {'varied':>9} {best * 1e6:>11.2f}")
+
+    for codec in wire.CODECS:
+        server, real, table = make_table(codec)
+        send = table.send_message
+
+        def repeated_fanout():
+            for player_id, health in zip(ids, repeated):
+                send(player_id, "health", health=health)
+
+        def varied_fanout():
+            for player_id in ids:
+                send(player_id, "health", health=next(varied))
+
+        def wheel_fanout():
+            for player_id in ids:
+                send(player_id, "light_wheel", next(wheels))
+
+        for name, func in (("repeated", repeated_fanout), ("varied", varied_fanout), ("wheel", wheel_fanout)):
+            best = min(timeit.repeat(func, number=ROUNDS, repeat=5)) / (ROUNDS * PLAYERS)
+            print(f"{codec:>10} {name:>9} {best * 1e6:>11.2f}")
+
+        server.client = real
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import contextlib
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+# Tables per host against worker processes, end to end through supervisor.py.
+#
+# A Supervisor runs the embedded broker and WORKERS worker processes and
+# creates TABLES_PER_WORKER tables per worker. Bot processes play PLAYERS
+# remotes per table over MQTT: they publish presence, answer every role with
+# a binary pick, guess or bet, and the workers run the games. Aggregate
+# rounds/s is read from Supervisor.status() over a timed window, so it
+# covers the broker, the sockets, decoding, the engine and the replies. The
+# broker is one process whatever the worker count, so it caps the speedup.
+#
+#   python tests/bench/tables.py          # 1, 2, 4 ... up to the core count
+#   python tests/bench/tables.py 1 3 6    # chosen worker counts
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "game", "physical", "server"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "game", "physical", "common"))
+
+import paho.mqtt.client as mqtt
+
+import wire
+from players import PlayerState
+from supervisor import Supervisor
+
+TABLES_PER_WORKER = 8
+PLAYERS = 8
+# Seconds to let every table reach steady play, then to count rounds over
+WARMUP = 2
+DURATION = 5
+# Everyone submits 0, so guessers heal and no better's health changes:
+# games only end at ROUNDS
+ROUNDS = 60000
+
+RESPONSES = {
+    PlayerState.PICKER: ("picker", "pick"),
+    PlayerState.GUESSER: ("guesser", "guess"),
+    PlayerState.BETTER: ("better", "bet"),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def bot(port, tables, ready):
+    """PLAYERS remotes on each of `tables`, sharing one MQTT connection."""
+    client = mqtt.Client()
+
+    def on_connect(client, userdata, flags, rc):
+        for table in tables:
+            client.subscribe(wire.topic(table, "client", "+"), 1)
+            for player_id in range(1, PLAYERS + 1):
+                client.publish(wire.topic(table, "presence", player_id),
+                               wire.encode(wire.BINARY, "connect", player_id, codec=wire.BINARY), qos=1, retain=True)
+        ready.set()
+
+    def on_message(client, userdata, msg):
+        payload = wire.decode(msg.payload)
+        if payload["type"] != "role":
+            return
+        role, _, index = str(payload["data"]).partition("+")
+        response = RESPONSES.get(int(role))
+        if response is None:
+            return
+        channel, msg_type = response
+        table = msg.topic.split("/")[1]
+        player_id = int(msg.topic.rsplit("/", 1)[1])
+        client.publish(wire.topic(table, channel, "response"),
+                       wire.encode(wire.BINARY, msg_type, player_id, 0, index=int(index or 0)), qos=1)
+
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect("127.0.0.1", port)
+    client.loop_forever()
+
+
+def total_rounds(supervisor):
+    return sum(status["round"] for status in supervisor.status().values())
+
+
+def run(workers):
+    port = free_port()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        supervisor = Supervisor("127.0.0.1", port, "embedded", workers)
+        bots = []
+        try:
+            tables = [supervisor.create_table(rounds=ROUNDS) for _ in range(workers * TABLES_PER_WORKER)]
+            for n in range(workers):
+                ready = multiprocessing.Event()
+                process = multiprocessing.Process(target=bot, args=(port, tables[n::workers], ready), daemon=True)
+                process.start()
+                ready.wait(10)
+                bots.append(process)
+            # Let retained presence reach every table before the games start
+            time.sleep(1)
+            supervisor.start()
+            time.sleep(WARMUP)
+            before, started = total_rounds(supervisor), time.perf_counter()
+            time.sleep(DURATION)
+            after, elapsed = total_rounds(supervisor), time.perf_counter() - started
+        finally:
+            supervisor.close()
+            for process in bots:
+                process.terminate()
+    return (after - before) / elapsed
+
+
+def main():
+    cores = os.cpu_count()
+    counts = [int(arg) for arg in sys.argv[1:]] or [1]
+    if not sys.argv[1:]:
+        while counts[-1] * 2 <= cores:
+            counts.append(counts[-1] * 2)
+        if counts[-1] != cores:
+            counts.append(cores)
+
+    print(f"{cores} cores, {TABLES_PER_WORKER} tables of {PLAYERS} players per worker")
+    print(f"{'workers':>8} {'tables':>7} {'rounds/s':>10} {'speedup':>8} {'efficiency':>11}")
+    base = None
+    for workers in counts:
+        rate = run(workers)
+        base = base or rate
+        print(f"{workers:>8} {workers * TABLES_PER_WORKER:>7} {rate:>10.0f} "
+              f"{rate / base:>7.2f}x {rate / base / workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import timeit
+
+# Encode/decode time and bytes on the wire for the JSON and binary codecs
+# in game/physical/common/wire.py, for the messages a remote handles most.
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "game", "physical", "common"))
+
+import wire
+
+NUMBER = 50000
+
+MESSAGES = [
+    ("ping", dict(msg_type="ping", client_id=7)),
+    ("pick", dict(msg_type="pick", client_id=7, data=12)),
+    ("guess", dict(msg_type="guess", client_id=7, data=42, index=2)),
+    ("bet", dict(msg_type="bet", client_id=7, data=9, index=5)),
+    ("health", dict(msg_type="health", client_id=0, health=13)),
+    ("role", dict(msg_type="role", client_id=0, data="4+3")),
+    ("wheel", dict(msg_type="light_wheel", client_id=0, data=[3, 8])),
+]
+
+
+def main():
+    print(f"{'message':>8} {'codec':>7} {'bytes':>6} {'encode us':>10} {'decode us':>10}")
+    totals = {codec: [0, 0.0, 0.0] for codec in wire.CODECS}
+    for name, kwargs in MESSAGES:
+        for codec in wire.CODECS:
+            encoded = wire.encode(codec, **kwargs)
+            assert wire.decode(encoded)["type"] == kwargs["msg_type"]
+            enc = min(timeit.repeat(lambda: wire.encode(codec, **kwargs), number=NUMBER, repeat=3)) / NUMBER
+            dec = min(timeit.repeat(lambda: wire.decode(encoded), number=NUMBER, repeat=3)) / NUMBER
+            size = len(encoded)
+            totals[codec][0] += size
+            totals[codec][1] += enc
+            totals[codec][2] += dec
+            print(f"{name:>8} {codec:>7} {size:>6} {enc * 1e6:>10.2f} {dec * 1e6:>10.2f}")
+    print()
+    for codec, (size, enc, dec) in totals.items():
+        print(f"{'total':>8} {codec:>7} {size:>6} {enc * 1e6:>10.2f} {dec * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
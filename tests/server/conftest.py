@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The server modules import each other and the shared codec by bare name,
+# the same way main.py and the benchmarks run them
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, "..", "..", "game", "physical", "server"))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "game", "physical", "common"))
@@ -0,0 +1,69 @@
+import itertools
+import json
+import time
+
+import wire
+from engine import GameEngine, GameState
+from scheduler import Deadline
+
+# Stand-ins for the scheduler and the Table an engine normally runs with, so
+# tests drive it one call at a time and fire deadlines by hand.
+
+
+class FakeScheduler:
+    """Keeps deadlines until a test fires them."""
+
+    def __init__(self):
+        self.deadlines = []
+        self._seq = itertools.count()
+
+    def call_at(self, when, callback, *args):
+        deadline = Deadline(when, next(self._seq), callback, args)
+        self.deadlines.append(deadline)
+        return deadline
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    def cancel(self, deadline):
+        if deadline is not None:
+            deadline.cancel()
+
+    def fire(self, deadline):
+        assert deadline is not None and not deadline.cancelled
+        deadline.cancel()
+        deadline.callback(*deadline.args)
+
+
+class FakeOut:
+    """Records what the engine sends, as (client id, type, data, extra)."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, client_id, msg_type, data=None, **extra):
+        self.sent.append((client_id, msg_type, data, extra))
+
+    def send_encoded(self, client_id, prepared):
+        payload = json.loads(prepared[wire.JSON])
+        msg_type = payload.pop("type")
+        data = payload.pop("data", None)
+        self.sent.append((client_id, msg_type, data, payload))
+
+    def of_type(self, msg_type):
+        return [(client_id, data) for client_id, sent_type, data, _ in self.sent if sent_type == msg_type]
+
+    def roles(self):
+        return dict(self.of_type("role"))
+
+
+def make_engine(players=4, rounds=1, policies=None, console=False):
+    state = GameState()
+    state.max_rounds = rounds
+    state.console_connected = console
+    scheduler = FakeScheduler()
+    out = FakeOut()
+    engine = GameEngine(state, out, scheduler, policies=policies)
+    for client_id in range(1, players + 1):
+        engine.on_join(client_id)
+    return engine, scheduler, out
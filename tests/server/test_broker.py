@@ -0,0 +1,144 @@
+import queue
+import threading
+
+import paho.mqtt.client as mqtt
+import pytest
+
+from broker import Broker, topic_matches, valid_filter
+
+TIMEOUT = 5
+
+# paho 2 warns about the callback API version the server uses as well
+pytestmark = pytest.mark.filterwarnings("ignore:Callback API version 1:DeprecationWarning")
+
+
+@pytest.fixture
+def broker():
+    broker = Broker("127.0.0.1", 0)
+    broker.start()
+    yield broker
+    broker.stop()
+
+
+class Client:
+    """A paho client whose received messages queue up as (topic, payload, retain)."""
+
+    def __init__(self, broker, client_id, will=None):
+        self.messages = queue.Queue()
+        self.subscribed = threading.Event()
+        self.client = mqtt.Client(client_id=client_id)
+        if will is not None:
+            self.client.will_set(*will)
+        self.client.on_message = lambda client, userdata, msg: self.messages.put(
+            (msg.topic, msg.payload, bool(msg.retain)))
+        self.client.on_subscribe = lambda *args: self.subscribed.set()
+        self.client.connect("127.0.0.1", broker.port)
+        self.client.loop_start()
+
+    def subscribe(self, topic_filter, qos=1):
+        self.subscribed.clear()
+        self.client.subscribe(topic_filter, qos)
+        assert self.subscribed.wait(TIMEOUT)
+
+    def publish(self, topic, payload, qos=1, retain=False):
+        self.client.publish(topic, payload, qos=qos, retain=retain).wait_for_publish(TIMEOUT)
+
+    def receive(self):
+        return self.messages.get(timeout=TIMEOUT)
+
+    def nothing_received(self):
+        try:
+            self.messages.get(timeout=0.2)
+        except queue.Empty:
+            return True
+        return False
+
+    def disconnect(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+
+    def drop(self):
+        """Vanish without a DISCONNECT, like a remote losing power."""
+        self.client.loop_stop()
+        self.client.socket().close()
+
+
+@pytest.mark.parametrize("topic_filter, topic, matches", [
+    ("game/client/3", "game/client/3", True),
+    ("game/client/3", "game/client/4", False),
+    ("game/+/response", "game/picker/response", True),
+    ("game/+/response", "game/2/picker/response", False),
+    ("game/+/presence/+", "game/2/presence/5", True),
+    ("game/#", "game/2/presence/5", True),
+    ("game/#", "game", True),
+    ("#", "$SYS/broker/uptime", False),
+    ("+/client", "$SYS/client", False),
+])
+def test_topic_matches(topic_filter, topic, matches):
+    assert topic_matches(topic_filter, topic) == matches
+
+
+@pytest.mark.parametrize("topic_filter, valid", [
+    ("game/+/response", True),
+    ("game/#", True),
+    ("game/#/response", False),
+    ("game/pick+", False),
+    ("", False),
+])
+def test_valid_filter(topic_filter, valid):
+    assert valid_filter(topic_filter) == valid
+
+
+def test_wildcard_subscriptions(broker):
+    server = Client(broker, "server")
+    server.subscribe("game/+/response")
+    remote = Client(broker, "remote")
+    remote.publish("game/2/picker/response", b"skipped")
+    remote.publish("game/picker/response", b"pick")
+    assert server.receive() == ("game/picker/response", b"pick", False)
+    assert server.nothing_received()
+    server.disconnect()
+    remote.disconnect()
+
+
+def test_retained_message_reaches_late_subscribers(broker):
+    remote = Client(broker, "remote")
+    remote.publish("game/presence/3", b"online", retain=True)
+    server = Client(broker, "server")
+    server.subscribe("game/presence/+")
+    assert server.receive() == ("game/presence/3", b"online", True)
+
+    # Live delivery to an existing subscriber isn't flagged retained
+    remote.publish("game/presence/3", b"offline", retain=True)
+    assert server.receive() == ("game/presence/3", b"offline", False)
+
+    # An empty retained payload clears it
+    remote.publish("game/presence/3", b"", retain=True)
+    assert server.receive() == ("game/presence/3", b"", False)
+    late = Client(broker, "late")
+    late.subscribe("game/#")
+    assert late.nothing_received()
+    for client in (remote, server, late):
+        client.disconnect()
+
+
+def test_will_published_when_a_client_drops(broker):
+    server = Client(broker, "server")
+    server.subscribe("game/presence/+")
+    remote = Client(broker, "remote", will=("game/presence/4", b"offline", 1, True))
+    remote.publish("game/presence/4", b"online", retain=True)
+    assert server.receive() == ("game/presence/4", b"online", False)
+    remote.drop()
+    assert server.receive() == ("game/presence/4", b"offline", False)
+    # The will was retained in place of "online"
+    assert broker.retained["game/presence/4"][0] == b"offline"
+    server.disconnect()
+
+
+def test_no_will_on_clean_disconnect(broker):
+    server = Client(broker, "server")
+    server.subscribe("game/presence/+")
+    remote = Client(broker, "remote", will=("game/presence/4", b"offline", 1, True))
+    remote.disconnect()
+    assert server.nothing_received()
+    server.disconnect()
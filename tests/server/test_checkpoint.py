@@ -0,0 +1,103 @@
+import pytest
+
+import checkpoint
+from checkpoint import Checkpoint, path_for
+from engine import GameEngine, GameState, Phase
+from fakes import FakeOut, FakeScheduler, make_engine
+from players import PlayerState
+
+
+def mid_round():
+    """An engine in Guessing/Betting with the pick and one guess made."""
+    engine, scheduler, out = make_engine(players=5, rounds=3)
+    engine.start()
+    engine.on_bet(engine.betters[0].id, 4)
+    engine.on_pick(engine.picker.id, 6)
+    engine.on_guess(engine.guessers[0].id, 1, 2)
+    return engine
+
+
+def test_encode_round_trip():
+    snapshot = mid_round().snapshot()
+    assert checkpoint.decode(checkpoint.encode(snapshot)) == snapshot
+
+
+def test_encode_round_trip_lobby():
+    engine, scheduler, out = make_engine()
+    snapshot = engine.snapshot()
+    assert snapshot["picker_num"] is None
+    assert checkpoint.decode(checkpoint.encode(snapshot)) == snapshot
+
+
+@pytest.mark.parametrize("data", [b"", b"GRCP", b"XXXX" + bytes(40)])
+def test_decode_rejects_garbage(data):
+    with pytest.raises(ValueError):
+        checkpoint.decode(data)
+
+
+def test_decode_rejects_truncated():
+    data = checkpoint.encode(mid_round().snapshot())
+    with pytest.raises(ValueError):
+        checkpoint.decode(data[:-1])
+
+
+def test_save_load_clear(tmp_path):
+    saved = Checkpoint(path_for(str(tmp_path), "7"))
+    assert saved.load() is None
+    snapshot = mid_round().snapshot()
+    saved.save(snapshot)
+    assert saved.load() == snapshot
+    assert not (tmp_path / "table-7.bin.tmp").exists()
+    saved.clear()
+    assert saved.load() is None
+
+
+def test_restore_resumes_the_round():
+    old = mid_round()
+    snapshot = checkpoint.decode(checkpoint.encode(old.snapshot()))
+
+    state = GameState()
+    scheduler, out = FakeScheduler(), FakeOut()
+    engine = GameEngine(state, out, scheduler)
+    engine.restore(snapshot)
+    assert engine.phase == Phase.GUESSING
+    assert engine.round == 1
+    assert engine.picker_num == 6
+    assert engine.picker.id == old.picker.id
+    assert [g.id for g in engine.guessers] == [g.id for g in old.guessers]
+    # The bet survives, the guess made after the last save has to be made again
+    assert engine.submissions.missing == {("guess", 1), ("guess", 2), ("bet", old.betters[1].id)}
+
+    # Players come back as their retained presence arrives
+    guesser = old.guessers[1]
+    engine.on_join(guesser.id)
+    assert engine.players.get(guesser.id).state == PlayerState.GUESSER
+    assert out.roles()[guesser.id] == f"{PlayerState.GUESSER}+2"
+
+
+def test_restore_forgets_players_who_never_return():
+    snapshot = mid_round().snapshot()
+    engine = GameEngine(GameState(), FakeOut(), FakeScheduler())
+    engine.restore(snapshot)
+    player_id = next(iter(engine.departed))
+    grace = engine.departed[player_id][1]
+    engine.scheduler.fire(grace)
+    assert player_id not in engine.departed
+
+
+def test_engine_checkpoints_and_clears_on_finish(tmp_path):
+    saved = Checkpoint(path_for(str(tmp_path)))
+    state = GameState()
+    scheduler = FakeScheduler()
+    engine = GameEngine(state, FakeOut(), scheduler, checkpoint=saved)
+    for client_id in range(1, 5):
+        engine.on_join(client_id)
+    engine.start()
+    assert saved.load()["phase"] == Phase.PICKING
+    engine.on_pick(engine.picker.id, 5)
+    assert saved.load()["phase"] == Phase.GUESSING
+    scheduler.fire(engine.deadline)
+    assert saved.load()["phase"] == Phase.GAME_OVER
+    # A finished game leaves nothing to resume
+    scheduler.fire(engine.deadline)
+    assert saved.load() is None
@@ -0,0 +1,169 @@
+import pytest
+
+from engine import CONSOLE_ID, Phase
+from fakes import make_engine
+from players import PlayerState
+
+
+def test_start_needs_three_players():
+    engine, scheduler, out = make_engine(players=2)
+    engine.start()
+    assert engine.phase == Phase.LOBBY
+    assert not engine.state.started
+    assert engine.state.accepting_players
+
+
+def test_round_flow():
+    engine, scheduler, out = make_engine()
+    engine.start()
+    assert engine.phase == Phase.PICKING
+    assert engine.round == 1
+    picker, (first, second), betters = engine.picker, engine.guessers, engine.betters
+    # Without a console the wheels are skipped and roles go out at once
+    assert out.roles() == {picker.id: f"{PlayerState.PICKER}", betters[0].id: f"{PlayerState.BETTER}+1"}
+
+    engine.on_pick(picker.id, 5)
+    assert engine.phase == Phase.GUESSING
+    assert out.roles()[first.id] == f"{PlayerState.GUESSER}+1"
+    assert out.roles()[second.id] == f"{PlayerState.GUESSER}+2"
+
+    engine.on_guess(first.id, 1, 5)
+    engine.on_bet(betters[0].id, 5)
+    assert engine.phase == Phase.GUESSING
+    engine.on_guess(second.id, 2, 9)
+    # The only round was played
+    assert engine.phase == Phase.GAME_OVER
+    assert first.health == 15
+    assert second.health == 11
+    assert betters[0].health == 15 + engine.rules.bet_delta(5, 5)
+    healths = {client_id: extra["health"] for client_id, msg_type, _, extra in out.sent if msg_type == "health"}
+    assert healths == {first.id: 15, second.id: 11, betters[0].id: betters[0].health}
+
+    scheduler.fire(engine.deadline)
+    assert not engine.state.started
+    assert engine.state.accepting_players
+    assert sorted(client_id for client_id, _ in out.of_type("off")) == [1, 2, 3, 4]
+
+
+def test_inputs_outside_their_phase_are_ignored():
+    engine, scheduler, out = make_engine()
+    engine.start()
+    first = engine.guessers[0]
+    engine.on_guess(first.id, 1, 5)
+    assert engine.phase == Phase.PICKING
+    engine.on_pick(first.id, 5)
+    assert engine.phase == Phase.PICKING
+    engine.on_pick(engine.picker.id, 5)
+    assert engine.submissions.missing == {("guess", 1), ("guess", 2), ("bet", engine.betters[0].id)}
+
+
+def test_next_round_starts_after_scoring():
+    engine, scheduler, out = make_engine(rounds=3)
+    engine.start()
+    engine.on_pick(engine.picker.id, 5)
+    for i, guesser in enumerate(engine.guessers):
+        engine.on_guess(guesser.id, i + 1, 5)
+    engine.on_bet(engine.betters[0].id, 5)
+    assert engine.phase == Phase.PICKING
+    assert engine.round == 2
+
+
+def test_roles_wait_for_the_console_wheel():
+    engine, scheduler, out = make_engine(console=True)
+    engine.start()
+    assert out.roles() == {}
+    assert out.of_type("light_wheel") == [(CONSOLE_ID, engine.picker.id)]
+    engine.on_wheel_done()
+    assert out.roles()[engine.picker.id] == f"{PlayerState.PICKER}"
+
+    engine.on_pick(engine.picker.id, 5)
+    guessers = engine.guessers
+    assert guessers[0].id not in out.roles()
+    # No "done" for the guessers' wheel: the fallback reveals them
+    scheduler.fire(engine.reveals[0][1])
+    assert out.roles()[guessers[0].id] == f"{PlayerState.GUESSER}+1"
+    assert not engine.reveals
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        make_engine(policies={"pick": "skip"})
+
+
+def test_pick_timeout_random():
+    engine, scheduler, out = make_engine()
+    engine.start()
+    picker = engine.picker
+    scheduler.fire(engine.deadline)
+    assert engine.phase == Phase.GUESSING
+    assert 0 <= engine.picker_num <= engine.rules.input_max
+    assert picker.idle
+
+
+def test_pick_timeout_last():
+    engine, scheduler, out = make_engine(policies={"pick": "last"})
+    engine.start()
+    engine.picker.last_input = 9
+    scheduler.fire(engine.deadline)
+    assert engine.picker_num == 9
+
+
+def test_pick_timeout_forfeit_abandons_the_round():
+    engine, scheduler, out = make_engine(rounds=3, policies={"pick": "forfeit"})
+    engine.start()
+    picker = engine.picker
+    scheduler.fire(engine.deadline)
+    assert engine.phase == Phase.PICKING
+    assert engine.round == 2
+    assert picker.idle
+    assert all(player.health == 15 for player in engine.players)
+
+
+def test_guess_timeout_forfeit_one_guesser():
+    engine, scheduler, out = make_engine()
+    engine.start()
+    engine.on_pick(engine.picker.id, 5)
+    first, second = engine.guessers
+    better = engine.betters[0]
+    engine.on_guess(first.id, 1, 0)
+    scheduler.fire(engine.deadline)
+    # The furthest a guess can be from 5 is 15 - 5
+    assert second.health == 15 - 10
+    assert second.idle
+    assert first.health == 15
+    assert not first.idle
+    # A missed bet sits the round out
+    assert better.health == 15
+    assert better.idle
+
+
+def test_guess_timeout_forfeit_both_guessers():
+    engine, scheduler, out = make_engine()
+    engine.start()
+    engine.on_pick(engine.picker.id, 12)
+    first, second = engine.guessers
+    scheduler.fire(engine.deadline)
+    assert first.health == second.health == 15 - 12
+
+
+def test_guess_timeout_last():
+    engine, scheduler, out = make_engine(policies={"guess": "last", "bet": "last"})
+    engine.start()
+    engine.on_pick(engine.picker.id, 5)
+    first, second = engine.guessers
+    first.last_input, second.last_input = 5, 9
+    better = engine.betters[0]
+    better.last_input = 5
+    scheduler.fire(engine.deadline)
+    assert first.health == 15
+    assert second.health == 15 - 4
+    assert better.health == 15 + engine.rules.bet_delta(5, 5)
+
+
+def test_stale_deadline_is_cancelled():
+    engine, scheduler, out = make_engine()
+    engine.start()
+    picking = engine.deadline
+    engine.on_pick(engine.picker.id, 5)
+    assert picking.cancelled
+    assert engine.deadline is not picking
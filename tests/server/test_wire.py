@@ -0,0 +1,76 @@
+import pytest
+
+import wire
+
+ROUND_TRIPS = [
+    ("pick", 3, 12, {}),
+    ("guess", 4, 7, {"index": 2}),
+    ("bet", 5, 0, {"index": 1}),
+    ("role", 2, "3+1", {}),
+    ("role", 2, "2", {}),
+    ("light_wheel", 0, 4, {}),
+    ("light_wheel", 0, [3, 8], {}),
+    ("light_wheel", 0, [3, 8], {"fake": True}),
+    ("light_wheel", 0, 6, {"fake": False}),
+    ("light_wheel", 0, "off", {}),
+    ("light_wheel", 0, "done", {}),
+    ("clients", 0, [1, 2, 5], {}),
+    ("ping", 7, 54321, {}),
+    ("start", 0, None, {}),
+    ("win", 6, None, {}),
+]
+
+
+def as_bytes(encoded):
+    return encoded.encode() if isinstance(encoded, str) else encoded
+
+
+@pytest.mark.parametrize("codec", wire.CODECS)
+@pytest.mark.parametrize("msg_type, client_id, data, extra", ROUND_TRIPS)
+def test_round_trip(codec, msg_type, client_id, data, extra):
+    payload = wire.decode(as_bytes(wire.encode(codec, msg_type, client_id, data, **extra)))
+    assert payload["type"] == msg_type
+    assert payload["id"] == client_id
+    assert payload.get("data") == data
+    for key, value in extra.items():
+        assert payload[key] == value
+
+
+@pytest.mark.parametrize("codec", wire.CODECS)
+def test_health_round_trip(codec):
+    payload = wire.decode(as_bytes(wire.encode(codec, "health", 4, health=-3)))
+    assert payload["health"] == -3
+
+
+@pytest.mark.parametrize("codec", wire.CODECS)
+def test_rules_round_trip(codec):
+    rules = {"max_health": 100, "bet_window": 10, "bet_bonus": 10, "penalty_cutoff": 70,
+             "input_max": 100, "binary_display": True}
+    payload = wire.decode(as_bytes(wire.encode(codec, "rules", 1, rules)))
+    assert payload["data"] == rules
+
+
+def test_connect_carries_codec():
+    for codec in wire.CODECS:
+        payload = wire.decode(wire.encode_binary("connect", 3, codec=codec))
+        assert payload["codec"] == codec
+
+
+def test_binary_is_smaller():
+    assert len(wire.encode(wire.BINARY, "guess", 4, 7, index=2)) < len(wire.encode(wire.JSON, "guess", 4, 7, index=2))
+
+
+@pytest.mark.parametrize("raw", [b"", b"\x7f\x01", b"\x04\x01", b"\x05\x01\x02", b"{not json", b"[1, 2]"])
+def test_decode_rejects_malformed(raw):
+    with pytest.raises(ValueError):
+        wire.decode(raw)
+
+
+def test_encode_binary_rejects_unknown_type():
+    with pytest.raises(ValueError):
+        wire.encode_binary("display", 0, "hello")
+
+
+def test_topic():
+    assert wire.topic(None, "client", 7) == "game/client/7"
+    assert wire.topic("3", "presence", "+") == "game/3/presence/+"